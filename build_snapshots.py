@@ -0,0 +1,227 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from export_incremental import DEFAULT_STORE, read_table
+
+# Prebuilt offline snapshot packs for first sync of the PWA.
+#
+# For every student this writes one compressed, versioned file holding the
+# records for each IndexedDB store created by initDB() in src/services/db.js
+# (families, members, visits, villages, reflections) plus the form registry
+# and clinical guidelines, so a new device loads everything in one download.
+#
+# Each pack keeps a per-record hash index. When a student's data changes the
+# next build also writes a delta from each retained older version (upserts +
+# deletes), so devices already holding a snapshot only fetch the difference.
+#
+# Layout:
+#   snapshots/<student_id>/latest.json              current version + file names
+#   snapshots/<student_id>/<version>.json.gz        full pack
+#   snapshots/<student_id>/<version>.index.json.gz  record hashes (for deltas)
+#   snapshots/<student_id>/delta-<from>-<to>.json.gz
+#
+# The client side is scaffolding only: db.js can import a pack or delta, but
+# no hosting or first-sync download path exists in the app yet.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'data')
+DEFAULT_OUTPUT = 'snapshots'
+FORMAT_VERSION = 1
+# Older versions kept so devices that missed a few builds still get a delta.
+KEEP_VERSIONS = 5
+
+
+def _compact(row):
+    # Nulls are the default on the client; dropping them keeps packs small.
+    return {k: v for k, v in row.items() if v is not None}
+
+
+def _digest(obj):
+    payload = json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_content():
+    with open(os.path.join(DATA_DIR, 'forms', 'registry.json'), 'r', encoding='utf-8') as f:
+        forms = json.load(f)
+    with open(os.path.join(DATA_DIR, 'resources', 'clinical_guidelines.json'), 'r', encoding='utf-8') as f:
+        guidelines = json.load(f)
+    content = {'forms': forms, 'guidelines': guidelines}
+    return content, _digest(content)[:16]
+
+
+def build_store_records(store):
+    # student_id -> {idb_store: [record, ...]} in the shape the client indexes
+    # use (familyId, studentId, date) alongside the original columns.
+    families = read_table(store, 'families')
+    members = read_table(store, 'family_members')
+    visits = read_table(store, 'family_visits')
+    villages = read_table(store, 'villages')
+    reflections = read_table(store, 'reflections')
+
+    owner = {f['id']: f.get('student_id') for f in families.values()}
+    records = defaultdict(lambda: defaultdict(list))
+
+    for f in families.values():
+        records[f.get('student_id')]['families'].append(_compact(f))
+    for m in members.values():
+        records[owner.get(m.get('family_id'))]['members'].append(_compact({**m, 'familyId': m.get('family_id')}))
+    for v in visits.values():
+        student = owner.get(v.get('family_id')) or v.get('student_id')
+        records[student]['visits'].append(_compact({**v, 'familyId': v.get('family_id'), 'date': v.get('visit_date')}))
+    for v in villages.values():
+        records[v.get('student_id')]['villages'].append(_compact(v))
+    for r in reflections.values():
+        records[r.get('student_id')]['reflections'].append(
+            _compact({**r, 'studentId': r.get('student_id'), 'familyId': r.get('family_id')}))
+
+    records.pop(None, None)
+    return records
+
+
+def _write_gz(path, obj):
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=9) as f:
+        json.dump(obj, f, separators=(',', ':'), ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+
+
+def _read_gz(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_latest(student_dir):
+    path = os.path.join(student_dir, 'latest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_delta(old_index, new_index, stores):
+    delta = {'upserts': {}, 'deletes': {}}
+    for name, records in stores.items():
+        old = old_index.get(name, {})
+        new = new_index[name]
+        upserts = [r for r in records if old.get(str(r['id'])) != new[str(r['id'])]]
+        deletes = [rid for rid in old if rid not in new]
+        if upserts:
+            delta['upserts'][name] = upserts
+        if deletes:
+            delta['deletes'][name] = deletes
+    return delta
+
+
+def build_student(output_dir, student_id, stores, content, content_version):
+    student_dir = os.path.join(output_dir, str(student_id))
+    os.makedirs(student_dir, exist_ok=True)
+
+    stores = {name: sorted(stores.get(name, []), key=lambda r: str(r['id']))
+              for name in ('families', 'members', 'visits', 'villages', 'reflections')}
+    index = {name: {str(r['id']): _digest(r)[:16] for r in records} for name, records in stores.items()}
+    version = _digest({'index': index, 'content': content_version, 'format': FORMAT_VERSION})[:16]
+
+    latest = _load_latest(student_dir)
+    if latest and latest['version'] == version:
+        return None
+
+    generated_at = datetime.now(timezone.utc).isoformat()
+    _write_gz(os.path.join(student_dir, f'{version}.json.gz'), {
+        'format': FORMAT_VERSION,
+        'student_id': student_id,
+        'version': version,
+        'generated_at': generated_at,
+        'content_version': content_version,
+        'stores': stores,
+        'content': content,
+    })
+    _write_gz(os.path.join(student_dir, f'{version}.index.json.gz'), index)
+
+    # Deltas from every retained older version to this one.
+    history = (latest or {}).get('history', [])
+    if latest:
+        history = [latest['version']] + [v for v in history if v != latest['version']]
+    history = history[:KEEP_VERSIONS]
+    deltas = {}
+    for old_version in history:
+        index_path = os.path.join(student_dir, f'{old_version}.index.json.gz')
+        if not os.path.exists(index_path):
+            continue
+        old_meta = _read_gz(index_path)
+        delta = make_delta(old_meta, index, stores)
+        delta.update({'format': FORMAT_VERSION, 'student_id': student_id, 'from': old_version, 'to': version,
+                      'content_version': content_version})
+        # Static content only travels when it actually changed.
+        if old_version not in (latest or {}).get('content_versions', {}) or \
+                latest['content_versions'][old_version] != content_version:
+            delta['content'] = content
+        name = f'delta-{old_version}-{version}.json.gz'
+        _write_gz(os.path.join(student_dir, name), delta)
+        deltas[old_version] = name
+
+    # Drop files of versions that fell out of the history window.
+    keep = set(history) | {version}
+    for name in os.listdir(student_dir):
+        if name == 'latest.json':
+            continue
+        if name.startswith('delta-'):
+            if name[len('delta-'):].split('-')[1].split('.')[0] != version:
+                os.remove(os.path.join(student_dir, name))
+        elif name.split('.')[0] not in keep:
+            os.remove(os.path.join(student_dir, name))
+
+    content_versions = dict((latest or {}).get('content_versions', {}))
+    content_versions[version] = content_version
+    content_versions = {v: c for v, c in content_versions.items() if v in keep}
+
+    pointer = {
+        'version': version,
+        'generated_at': generated_at,
+        'snapshot': f'{version}.json.gz',
+        'size_bytes': os.path.getsize(os.path.join(student_dir, f'{version}.json.gz')),
+        'deltas': deltas,
+        'history': history,
+        'content_versions': content_versions,
+    }
+    with open(os.path.join(student_dir, 'latest.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(pointer, f, indent=4)
+    os.replace(os.path.join(student_dir, 'latest.json.tmp'), os.path.join(student_dir, 'latest.json'))
+    return pointer
+
+
+def build_all(store=DEFAULT_STORE, output_dir=DEFAULT_OUTPUT, students=None):
+    content, content_version = load_content()
+    records = build_store_records(store)
+    profiles = read_table(store, 'profiles')
+    student_ids = students or sorted(p['id'] for p in profiles.values() if p.get('role') == 'student')
+
+    built, unchanged = [], 0
+    for student_id in student_ids:
+        pointer = build_student(output_dir, student_id, records.get(student_id, {}), content, content_version)
+        if pointer:
+            built.append((student_id, pointer))
+        else:
+            unchanged += 1
+    return built, unchanged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prebuild offline snapshot packs per student')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Export store from export_incremental.py')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Output directory')
+    parser.add_argument('--student', action='append', help='Only build these student ids')
+    args = parser.parse_args()
+
+    built, unchanged = build_all(args.store, args.output, args.student)
+    for student_id, pointer in built:
+        print(f"{student_id}: {pointer['version']} ({pointer['size_bytes'] / 1024:.1f} KB, {len(pointer['deltas'])} deltas)")
+    print(f"\n✅ {len(built)} snapshots built, {unchanged} unchanged")
+
+
+if __name__ == "__main__":
+    main()
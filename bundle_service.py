@@ -0,0 +1,290 @@
+import argparse
+import base64
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Aggregation service that returns everything a page needs about a student
+# (or a teacher's whole group) in one compressed response:
+#
+#   GET /bundle/student/<id>   families, members, visits, measurements, counts
+#   GET /bundle/teacher/<id>   the same for every actively mapped student
+#
+# Each bundle has a version hash computed from the (id, xmin) pairs (xmin
+# changes on every insert/update) of the underlying rows. It is sent as the
+# ETag; a request with a matching If-None-Match gets 304 without the bundle
+# being built. Built bundles are also kept gzipped in a small LRU cache keyed
+# by version. Callers authenticate with their Supabase access token and get
+# the same visibility RLS gives them: own data, mapped students, or admin.
+
+DEFAULT_PORT = 8787
+POOL_MIN = 1
+POOL_MAX = 10
+CACHE_ENTRIES = 500
+
+# Student ids a bundle covers, as a SQL fragment over %(id)s.
+SCOPES = {
+    'student': "SELECT %(id)s::uuid AS student_id",
+    'teacher': "SELECT student_id FROM teacher_student_mappings WHERE teacher_id = %(id)s AND is_active = true",
+}
+
+# Per table, a digest of the ordered (id, xmin) pairs: any insert, update or
+# delete changes it. (max(xmin) is not safe: after transaction-id wraparound
+# a newer row version can carry a numerically smaller xmin.)
+_VERSION_DIGEST = "(SELECT md5(coalesce(string_agg(id::text || '.' || xmin::text, ',' ORDER BY id), '')) FROM {cte})"
+
+VERSION_SQL = """
+WITH s AS ({{scope}}),
+f AS (SELECT id, xmin FROM families WHERE student_id IN (SELECT student_id FROM s)),
+m AS (SELECT id, xmin FROM family_members WHERE family_id IN (SELECT id FROM f)),
+v AS (SELECT id, xmin FROM family_visits WHERE family_id IN (SELECT id FROM f)),
+h AS (SELECT id, xmin FROM health_measurements WHERE member_id IN (SELECT id FROM m)),
+r AS (SELECT id, xmin FROM reflections WHERE student_id IN (SELECT student_id FROM s))
+SELECT concat_ws(':',
+    {digests},
+    (SELECT string_agg(student_id::text, ',' ORDER BY student_id) FROM s))
+""".format(digests=',\n    '.join(_VERSION_DIGEST.format(cte=cte) for cte in 'fmvhr'))
+
+# The whole bundle is assembled as JSON inside Postgres: one round trip and
+# no per-row Python objects.
+BUNDLE_SQL = """
+WITH s AS ({scope}),
+f AS (SELECT * FROM families WHERE student_id IN (SELECT student_id FROM s)),
+m AS (SELECT * FROM family_members WHERE family_id IN (SELECT id FROM f)),
+v AS (SELECT * FROM family_visits WHERE family_id IN (SELECT id FROM f)),
+h AS (SELECT * FROM health_measurements WHERE member_id IN (SELECT id FROM m))
+SELECT json_build_object(
+    'students', (SELECT coalesce(json_agg(student_id), '[]') FROM s),
+    'families', (SELECT coalesce(json_agg(f), '[]') FROM f),
+    'members', (SELECT coalesce(json_agg(m), '[]') FROM m),
+    'visits', (SELECT coalesce(json_agg(v ORDER BY v.visit_date DESC), '[]') FROM v),
+    'measurements', (SELECT coalesce(json_agg(h ORDER BY h.record_date), '[]') FROM h),
+    'counts', json_build_object(
+        'families', (SELECT count(*) FROM f),
+        'members', (SELECT count(*) FROM m),
+        'visits', (SELECT count(*) FROM v),
+        'reflections', (SELECT count(*) FROM reflections WHERE student_id IN (SELECT student_id FROM s)),
+        'reflections_pending', (SELECT count(*) FROM reflections
+                                WHERE student_id IN (SELECT student_id FROM s) AND (status = 'Pending' OR status IS NULL))
+    )
+)::text
+"""
+
+
+class AuthError(Exception):
+    pass
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def verify_token(token, secret):
+    # Supabase access tokens are HS256 JWTs signed with the project's JWT secret.
+    try:
+        header_b64, payload_b64, signature_b64 = token.split('.')
+        header = json.loads(_b64decode(header_b64))
+        payload = json.loads(_b64decode(payload_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, TypeError):
+        raise AuthError('malformed token')
+    if header.get('alg') != 'HS256':
+        raise AuthError('unsupported token algorithm')
+    expected = hmac.new(secret.encode('utf-8'), f"{header_b64}.{payload_b64}".encode('ascii'), hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise AuthError('bad signature')
+    if payload.get('exp', 0) < time.time():
+        raise AuthError('token expired')
+    if not payload.get('sub'):
+        raise AuthError('token has no subject')
+    return payload
+
+
+class BundleCache:
+    def __init__(self, size=CACHE_ENTRIES):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == etag:
+                self.entries.move_to_end(key)
+                return entry[1]
+            return None
+
+    def put(self, key, etag, body):
+        with self.lock:
+            self.entries[key] = (etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+class BundleService:
+    def __init__(self, dsn, jwt_secret, pool_min=POOL_MIN, pool_max=POOL_MAX, cache_entries=CACHE_ENTRIES):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self.pool = ThreadedConnectionPool(pool_min, pool_max, dsn)
+        # ThreadingHTTPServer starts a thread per request, but getconn()
+        # raises PoolError once pool_max connections are out; extra requests
+        # wait here for a free connection instead.
+        self.slots = threading.BoundedSemaphore(pool_max)
+        self.jwt_secret = jwt_secret
+        self.cache = BundleCache(cache_entries)
+
+    @contextmanager
+    def connection(self):
+        with self.slots:
+            conn = self.pool.getconn()
+            try:
+                # Version and bundle must come from the same snapshot, otherwise
+                # a write between the two queries would be served under the old ETag.
+                conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+                yield conn
+                conn.rollback()  # read-only; end the transaction before reuse
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self.pool.putconn(conn)
+
+    def authorize(self, cur, user_id, scope, target_id):
+        if user_id == target_id:
+            return True
+        cur.execute("SELECT role FROM profiles WHERE id = %s", (user_id,))
+        row = cur.fetchone()
+        if row and row[0] == 'admin':
+            return True
+        if scope == 'student' and row and row[0] == 'teacher':
+            cur.execute(
+                "SELECT 1 FROM teacher_student_mappings WHERE teacher_id = %s AND student_id = %s AND is_active = true",
+                (user_id, target_id),
+            )
+            return cur.fetchone() is not None
+        return False
+
+    def handle(self, scope, target_id, token, if_none_match):
+        # Returns (status, etag, gzipped_body_or_None).
+        claims = verify_token(token, self.jwt_secret)
+        key = (scope, target_id)
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                if not self.authorize(cur, claims['sub'], scope, target_id):
+                    return 403, None, None
+
+                cur.execute(VERSION_SQL.format(scope=SCOPES[scope]), {'id': target_id})
+                version = cur.fetchone()[0]
+                etag = '"' + hashlib.sha256(f"{scope}:{target_id}:{version}".encode('utf-8')).hexdigest()[:32] + '"'
+                if if_none_match and etag in [t.strip() for t in if_none_match.split(',')]:
+                    return 304, etag, None
+
+                body = self.cache.get(key, etag)
+                if body is None:
+                    cur.execute(BUNDLE_SQL.format(scope=SCOPES[scope]), {'id': target_id})
+                    bundle = cur.fetchone()[0]
+                    body = gzip.compress(bundle.encode('utf-8'), compresslevel=6)
+                    self.cache.put(key, etag, body)
+                return 200, etag, body
+
+
+PATH_RE = re.compile(r'^/bundle/(student|teacher)/([0-9a-fA-F-]{36})/?$')
+
+
+def make_handler(service, allowed_origin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _cors(self):
+            if allowed_origin:
+                self.send_header('Access-Control-Allow-Origin', allowed_origin)
+                self.send_header('Access-Control-Allow-Headers', 'Authorization, If-None-Match')
+                self.send_header('Access-Control-Expose-Headers', 'ETag')
+                self.send_header('Vary', 'Origin, Authorization, Accept-Encoding')
+
+        def _reply(self, status, body=b'', headers=None):
+            self.send_response(status)
+            self._cors()
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body and self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def _error(self, status, message):
+            self._reply(status, json.dumps({'error': message}).encode('utf-8'), {'Content-Type': 'application/json'})
+
+        def do_OPTIONS(self):
+            self._reply(204, headers={'Access-Control-Allow-Methods': 'GET, OPTIONS'})
+
+        def do_GET(self):
+            if self.path == '/health':
+                return self._reply(200, b'ok', {'Content-Type': 'text/plain'})
+            match = PATH_RE.match(self.path.split('?', 1)[0])
+            if not match:
+                return self._error(404, 'not found')
+            auth = self.headers.get('Authorization', '')
+            if not auth.startswith('Bearer '):
+                return self._error(401, 'missing bearer token')
+
+            try:
+                status, etag, body = service.handle(
+                    match.group(1), match.group(2).lower(), auth[7:], self.headers.get('If-None-Match'))
+            except AuthError as e:
+                return self._error(401, str(e))
+            except Exception as e:
+                self.log_error('bundle failed: %s', e)
+                return self._error(500, 'internal error')
+
+            if status == 403:
+                return self._error(403, 'forbidden')
+            headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+            if status == 304:
+                return self._reply(304, headers=headers)
+
+            headers['Content-Type'] = 'application/json'
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                headers['Content-Encoding'] = 'gzip'
+            else:
+                body = gzip.decompress(body)
+            self._reply(200, body, headers)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve per-student/teacher data bundles')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', DEFAULT_PORT)))
+    parser.add_argument('--pool-max', type=int, default=POOL_MAX, help='Max pooled database connections')
+    args = parser.parse_args()
+
+    dsn = os.environ.get('DATABASE_URL')
+    secret = os.environ.get('SUPABASE_JWT_SECRET')
+    if not dsn or not secret:
+        raise SystemExit('❌ DATABASE_URL and SUPABASE_JWT_SECRET must be set')
+
+    service = BundleService(dsn, secret, pool_max=args.pool_max)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, os.environ.get('ALLOWED_ORIGIN', '*')))
+    print(f"✅ Bundle service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
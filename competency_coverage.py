@@ -0,0 +1,253 @@
+import argparse
+import base64
+import gzip
+import json
+import os
+import re
+import time
+from collections import defaultdict
+
+from export_incremental import DEFAULT_STORE, read_table
+
+# Competency coverage for the whole cohort as packed bitsets.
+#
+# Visits (by form_id) and reflections (by tag) are mapped to NMC competency
+# codes through src/data/competencies/evidence_map.json, compiled once into
+# a lookup of bit masks. The matrix is stored column-wise: one bitset per
+# competency with bit i set when student i has evidence for it, plus bitsets
+# for each year and mentor group. Cohort questions then become a handful of
+# AND/NOT/popcount operations on Python ints, which run over all students a
+# machine word at a time.
+
+COMPETENCY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'data', 'competencies')
+DEFAULT_MATRIX = 'competency_coverage.json.gz'
+UNASSIGNED = 'unassigned'
+
+
+def _norm_tag(tag):
+    return re.sub(r'[\s_]+', ' ', str(tag).strip().lower())
+
+
+def load_competencies():
+    with open(os.path.join(COMPETENCY_DIR, 'nmc_competencies.json'), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    competencies = []
+    for year in (1, 2, 3):
+        for c in data[f'year_{year}']['competencies']:
+            competencies.append({'code': c['code'], 'year': year, 'competency': c['competency']})
+    return competencies
+
+
+def build_lookup(competencies):
+    # form_id -> mask and normalised tag -> mask, computed once per run.
+    with open(os.path.join(COMPETENCY_DIR, 'evidence_map.json'), 'r', encoding='utf-8') as f:
+        evidence = json.load(f)
+    bit = {c['code']: 1 << i for i, c in enumerate(competencies)}
+
+    def mask(codes):
+        unknown = [code for code in codes if code not in bit]
+        if unknown:
+            raise ValueError(f"evidence_map.json references unknown competencies: {unknown}")
+        m = 0
+        for code in codes:
+            m |= bit[code]
+        return m
+
+    forms = {form_id: mask(codes) for form_id, codes in evidence['forms'].items()}
+    tags = {_norm_tag(tag): mask(codes) for tag, codes in evidence['tags'].items()}
+    # Competency codes are valid tags too ("CM 2.4", "cm_2.4").
+    for code, b in bit.items():
+        tags[_norm_tag(code)] = tags.get(_norm_tag(code), 0) | b
+    return forms, tags
+
+
+class CoverageMatrix:
+    def __init__(self, students, competencies, columns, groups):
+        self.students = students            # index -> student id
+        self.competencies = competencies    # index -> {code, year, competency}
+        self.columns = columns              # competency index -> student bitset
+        self.groups = groups                # 'year:2' / 'mentor:<id>' -> student bitset
+        self.code_index = {c['code']: i for i, c in enumerate(competencies)}
+        self.all_students = (1 << len(students)) - 1
+
+    @classmethod
+    def from_rows(cls, students, competencies, rows, groups):
+        # rows: per-student competency bitsets -> transpose into columns.
+        columns = [0] * len(competencies)
+        for s, row in enumerate(rows):
+            while row:
+                low = row & -row
+                columns[low.bit_length() - 1] |= 1 << s
+                row ^= low
+        return cls(students, competencies, columns, groups)
+
+    def _group(self, year=None, mentor=None):
+        mask = self.all_students
+        if year is not None:
+            mask &= self.groups.get(f'year:{year}', 0)
+        if mentor is not None:
+            mask &= self.groups.get(f'mentor:{mentor}', 0)
+        return mask
+
+    def _ids(self, mask):
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.students[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def missing(self, code, year=None, mentor=None):
+        return self._ids(self._group(year, mentor) & ~self.columns[self.code_index[code]])
+
+    def covered(self, code, year=None, mentor=None):
+        return self._ids(self._group(year, mentor) & self.columns[self.code_index[code]])
+
+    def student_codes(self, student_id):
+        s = self.students.index(student_id)
+        return [c['code'] for i, c in enumerate(self.competencies) if self.columns[i] >> s & 1]
+
+    def mentor_coverage(self, code=None, competency_year=None):
+        # % of (student, competency) cells with evidence, per mentor group.
+        codes = [self.code_index[code]] if code else [
+            i for i, c in enumerate(self.competencies) if competency_year is None or c['year'] == competency_year
+        ]
+        result = {}
+        for name, mask in self.groups.items():
+            if not name.startswith('mentor:'):
+                continue
+            cells = mask.bit_count() * len(codes)
+            hits = sum((self.columns[i] & mask).bit_count() for i in codes)
+            result[name.split(':', 1)[1]] = round(100.0 * hits / cells, 1) if cells else 0.0
+        return result
+
+    def save(self, path):
+        nbytes = (len(self.students) + 7) // 8
+        pack = lambda m: base64.b64encode(m.to_bytes(nbytes, 'little')).decode('ascii')
+        payload = {
+            'version': 1,
+            'students': self.students,
+            'competencies': self.competencies,
+            'columns': [pack(m) for m in self.columns],
+            'groups': {name: pack(m) for name, m in self.groups.items()},
+        }
+        tmp = path + '.tmp'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        unpack = lambda s: int.from_bytes(base64.b64decode(s), 'little')
+        return cls(
+            payload['students'],
+            payload['competencies'],
+            [unpack(s) for s in payload['columns']],
+            {name: unpack(s) for name, s in payload['groups'].items()},
+        )
+
+
+def build_matrix(store=DEFAULT_STORE):
+    competencies = load_competencies()
+    form_masks, tag_masks = build_lookup(competencies)
+
+    profiles = read_table(store, 'profiles')
+    families = read_table(store, 'families')
+    visits = read_table(store, 'family_visits')
+    reflections = read_table(store, 'reflections')
+    mappings = read_table(store, 'teacher_student_mappings')
+
+    students = sorted(p['id'] for p in profiles.values() if p.get('role') == 'student')
+    index = {sid: i for i, sid in enumerate(students)}
+    rows = [0] * len(students)
+    owner = {f['id']: f.get('student_id') for f in families.values()}
+
+    for v in visits.values():
+        s = index.get(owner.get(v.get('family_id')) or v.get('student_id'))
+        if s is not None:
+            rows[s] |= form_masks.get((v.get('data') or {}).get('protocol'), 0)
+
+    for r in reflections.values():
+        s = index.get(r.get('student_id'))
+        if s is not None:
+            for tag in r.get('tags') or []:
+                rows[s] |= tag_masks.get(_norm_tag(tag), 0)
+
+    groups = defaultdict(int)
+    for sid, s in index.items():
+        year = profiles[sid].get('year')
+        if year:
+            groups[f'year:{year}'] |= 1 << s
+    assigned = 0
+    for m in mappings.values():
+        s = index.get(m.get('student_id'))
+        if s is not None and m.get('is_active', True):
+            groups[f"mentor:{m['teacher_id']}"] |= 1 << s
+            assigned |= 1 << s
+    unassigned = ((1 << len(students)) - 1) & ~assigned
+    if unassigned:
+        groups[f'mentor:{UNASSIGNED}'] = unassigned
+
+    return CoverageMatrix.from_rows(students, competencies, rows, dict(groups))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cohort competency coverage as packed bitsets')
+    parser.add_argument('--matrix', default=DEFAULT_MATRIX, help='Coverage matrix file')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_build = sub.add_parser('build', help='Build the matrix from the export store')
+    p_build.add_argument('--store', default=DEFAULT_STORE)
+
+    p_missing = sub.add_parser('missing', help='Students without evidence for a competency')
+    p_missing.add_argument('code', help='Competency code, e.g. "CM 2.4"')
+    p_missing.add_argument('--year', type=int, help='Only students in this year')
+    p_missing.add_argument('--mentor', help='Only students of this mentor id')
+
+    p_mentor = sub.add_parser('mentors', help='Coverage percentage per mentor')
+    p_mentor.add_argument('--code', help='Single competency (default: all)')
+    p_mentor.add_argument('--competency-year', type=int, help='Only competencies of this year')
+
+    p_student = sub.add_parser('student', help='Competencies evidenced by one student')
+    p_student.add_argument('student_id')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        matrix = build_matrix(args.store)
+        matrix.save(args.matrix)
+        print(f"✅ Coverage matrix: {len(matrix.students)} students x {len(matrix.competencies)} competencies "
+              f"({time.perf_counter() - started:.2f}s) -> {args.matrix}")
+        return
+
+    matrix = CoverageMatrix.load(args.matrix)
+    # Unknown codes and ids would otherwise surface as a KeyError/ValueError
+    # from the bitset lookups.
+    code = getattr(args, 'code', None)
+    if code is not None:
+        known = {_norm_tag(c): c for c in matrix.code_index}
+        if _norm_tag(code) not in known:
+            parser.error(f"unknown competency code {code!r} (e.g. {', '.join(list(matrix.code_index)[:3])})")
+        args.code = known[_norm_tag(code)]
+    if getattr(args, 'mentor', None) is not None and f'mentor:{args.mentor}' not in matrix.groups:
+        parser.error(f"no students mapped to mentor {args.mentor!r} in {args.matrix}")
+    if args.command == 'student' and args.student_id not in matrix.students:
+        parser.error(f"student {args.student_id!r} is not in {args.matrix} (rebuild it if the student is new)")
+
+    started = time.perf_counter()
+    if args.command == 'missing':
+        result = matrix.missing(args.code, args.year, args.mentor)
+    elif args.command == 'mentors':
+        result = matrix.mentor_coverage(args.code, args.competency_year)
+    else:
+        result = matrix.student_codes(args.student_id)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(json.dumps(result, indent=4))
+    print(f"\n({elapsed:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@
 -- Run this script to create 5 students and 2 teachers
 -- ============================================
 
+-- Faster: `python provision_users.py sample_roster.csv` creates the same
+-- users, profiles and mappings in one step (see README).
+
 -- IMPORTANT: First create these users in Supabase Auth Dashboard
 -- Then replace the UUIDs below with the actual User IDs
 
@@ -0,0 +1,287 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import time
+
+from docx.oxml import parse_xml
+from lxml import etree
+
+# Watch mode with section-level rebuilds for the python-docx generators
+# (generate_journal_article_v2.py, generate_documentation_kannada.py, ...).
+#
+# The generator's build function is split at its top-level
+# doc.add_heading(..., level 0/1) calls. Each chunk of statements is a
+# section, rendered on its own into a blank document; the body XML it
+# produces is cached under a hash of the section's source. On every save only
+# sections whose source changed are executed again; the rest are copied from
+# the cache and the whole file is reassembled and written in one go.
+#
+# Sections that share variables with earlier ones or add relationships
+# (images, hyperlinks) cannot be rendered alone; such scripts fall back to
+# running the whole function on each change.
+
+CACHE_DIR = '.docx_cache'
+# Bump when the section splitting or caching format changes.
+RENDERER_VERSION = 1
+POLL_SECONDS = 0.2
+
+
+class FullRebuild(Exception):
+    pass
+
+
+def _digest(*parts):
+    h = hashlib.sha256(str(RENDERER_VERSION).encode('ascii'))
+    for part in parts:
+        h.update(b'\0' + part.encode('utf-8'))
+    return h.hexdigest()[:24]
+
+
+def _is_doc_call(stmt, method):
+    return (isinstance(stmt, ast.Expr) or isinstance(stmt, ast.Assign)) and \
+        isinstance(stmt.value, ast.Call) and isinstance(stmt.value.func, ast.Attribute) and \
+        stmt.value.func.attr == method and isinstance(stmt.value.func.value, ast.Name) and \
+        stmt.value.func.value.id == 'doc'
+
+
+def _starts_section(stmt):
+    if not _is_doc_call(stmt, 'add_heading'):
+        return False
+    call = stmt.value
+    level = call.args[1] if len(call.args) > 1 else next((k.value for k in call.keywords if k.arg == 'level'), None)
+    if level is None:
+        return True  # add_heading defaults to level 1
+    return isinstance(level, ast.Constant) and level.value in (0, 1)
+
+
+class GeneratorScript:
+    # A generator module parsed into preamble / sections / save target.
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.source = f.read()
+        tree = ast.parse(self.source, self.path)
+        self.lines = self.source.splitlines(keepends=True)
+
+        func = next((node for node in tree.body if isinstance(node, ast.FunctionDef) and any(
+            isinstance(s, ast.Assign) and isinstance(s.value, ast.Call) and
+            getattr(s.value.func, 'id', None) == 'Document' for s in node.body)), None)
+        if func is None:
+            raise ValueError(f"{path}: no function building a Document() found")
+        self.function = func.name
+
+        body = func.body
+        first = next((i for i, s in enumerate(body) if _starts_section(s)), len(body))
+        save = next((i for i, s in enumerate(body) if _is_doc_call(s, 'save')), len(body))
+        self.preamble = body[:first]
+        self.output = None
+        if save < len(body) and isinstance(body[save].value.args[0], ast.Constant):
+            self.output = body[save].value.args[0].value
+
+        self.sections = []
+        for stmt in body[first:save]:
+            if _starts_section(stmt) or not self.sections:
+                self.sections.append([])
+            self.sections[-1].append(stmt)
+
+        # Module-level code (imports, constants) affects every section.
+        module_code = [n for n in tree.body if n is not func and not self._is_main_guard(n)]
+        self.module_key = _digest(*(self._text(n) for n in module_code + self.preamble))
+        self.module_code = module_code
+
+    @staticmethod
+    def _is_main_guard(node):
+        return isinstance(node, ast.If) and isinstance(node.test, ast.Compare) and \
+            getattr(node.test.left, 'id', None) == '__name__'
+
+    def _text(self, node):
+        # Whole source lines of a statement (ast.get_source_segment re-splits
+        # the file on every call, which dominates a no-change rebuild).
+        return ''.join(self.lines[node.lineno - 1:node.end_lineno])
+
+    def section_key(self, stmts):
+        return _digest(self.module_key, *(self._text(s) for s in stmts))
+
+    def section_title(self, stmts):
+        call = stmts[0].value
+        if _is_doc_call(stmts[0], 'add_heading') and call.args and isinstance(call.args[0], ast.Constant):
+            return str(call.args[0].value)[:60]
+        return '(untitled)'
+
+    def _compile(self, stmts):
+        return compile(ast.Module(body=stmts, type_ignores=[]), self.path, 'exec')
+
+    def namespace(self):
+        ns = {'__name__': '__docx_watch__', '__file__': self.path}
+        exec(self._compile(self.module_code), ns)
+        return ns
+
+    def new_document(self, ns):
+        local = dict(ns)
+        exec(self._compile(self.preamble), local)
+        return local
+
+    def render_section(self, ns, stmts):
+        # Returns the section's body elements serialized as XML strings.
+        local = self.new_document(ns)
+        doc = local['doc']
+        body = doc.element.body
+        baseline = len(body)
+        rels = len(doc.part.rels)
+        try:
+            exec(self._compile(stmts), local)
+        except NameError as e:
+            raise FullRebuild(f"section '{self.section_title(stmts)}' uses state from another section ({e})")
+        if len(doc.part.rels) != rels:
+            raise FullRebuild(f"section '{self.section_title(stmts)}' adds relationships (images/links)")
+        sect_pr = body.sectPr
+        # The sectPr element stays last; new content is inserted before it.
+        new = [el for el in list(body)[baseline - (1 if sect_pr is not None else 0):] if el is not sect_pr]
+        return [etree.tostring(el, encoding='unicode') for el in new]
+
+    def render_full(self, ns):
+        local = self.new_document(ns)
+        for stmts in self.sections:
+            exec(self._compile(stmts), local)
+        return local['doc']
+
+
+class SectionCache:
+    def __init__(self, script_path, cache_dir=CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, os.path.basename(script_path) + '.json')
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def save(self, keep):
+        # Only sections of the latest build are kept.
+        self.entries = {k: v for k, v in self.entries.items() if k in keep}
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(self.path + '.tmp', self.path)
+
+
+def _save(doc, output):
+    # Write next to the target and swap in, so a viewer never sees half a file.
+    tmp = output + '.tmp.docx'
+    doc.save(tmp)
+    os.replace(tmp, output)
+
+
+def build(script_path, output=None, cache_dir=CACHE_DIR, full=False):
+    started = time.perf_counter()
+    script = GeneratorScript(script_path)
+    output = output or script.output
+    if not output:
+        raise ValueError(f"{script_path}: doc.save() target not found; pass --output")
+    ns = script.namespace()
+
+    if not full:
+        cache = SectionCache(script.path, cache_dir)
+        keys = [script.section_key(stmts) for stmts in script.sections]
+        rebuilt = []
+        try:
+            for key, stmts in zip(keys, script.sections):
+                if key not in cache.entries:
+                    cache.entries[key] = script.render_section(ns, stmts)
+                    rebuilt.append(script.section_title(stmts))
+        except FullRebuild as e:
+            print(f"ℹ️  {os.path.basename(script_path)}: {e}; rebuilding whole document")
+        else:
+            doc = script.new_document(ns)['doc']
+            body = doc.element.body
+            sect_pr = body.sectPr
+            for key in keys:
+                for xml in cache.entries[key]:
+                    el = parse_xml(xml)
+                    if sect_pr is not None:
+                        sect_pr.addprevious(el)
+                    else:
+                        body.append(el)
+            _save(doc, output)
+            cache.save(set(keys))
+            return {'output': output, 'sections': len(keys), 'rebuilt': rebuilt,
+                    'seconds': time.perf_counter() - started}
+
+    _save(script.render_full(ns), output)
+    titles = [script.section_title(s) for s in script.sections]
+    return {'output': output, 'sections': len(titles), 'rebuilt': titles, 'seconds': time.perf_counter() - started}
+
+
+def _report(script_path, result):
+    changed = ', '.join(result['rebuilt']) if len(result['rebuilt']) <= 3 else f"{len(result['rebuilt'])} sections"
+    print(f"✅ {result['output']}: {len(result['rebuilt'])}/{result['sections']} sections rebuilt "
+          f"({changed or 'none'}) in {result['seconds']:.2f}s")
+
+
+def _mtimes(paths):
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            stamps[path] = None
+    return stamps
+
+
+def watch(scripts, extra_paths=(), cache_dir=CACHE_DIR, output=None, poll=POLL_SECONDS):
+    # Polling keeps this dependency-free; stat() on a handful of files every
+    # 200ms costs nothing. A change to an extra (content) file rebuilds every
+    # script in full, since any section may read it.
+    scripts = [os.path.abspath(s) for s in scripts]
+    extra_paths = [os.path.abspath(p) for p in extra_paths]
+
+    def run(script, full=False):
+        try:
+            _report(script, build(script, output, cache_dir, full))
+        except PermissionError as e:
+            print(f"❌ {os.path.basename(script)}: cannot write output ({e}); close it in Word and save again")
+        except Exception as e:
+            # Keep watching through syntax errors and typos mid-edit.
+            print(f"❌ {os.path.basename(script)}: {type(e).__name__}: {e}")
+
+    for script in scripts:
+        run(script)
+    seen = _mtimes(scripts + extra_paths)
+    print(f"👀 Watching {len(seen)} files (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(poll)
+            current = _mtimes(scripts + extra_paths)
+            changed = [p for p in current if current[p] != seen.get(p)]
+            seen = current
+            if any(p in extra_paths for p in changed):
+                for script in scripts:
+                    run(script, full=True)
+            else:
+                for script in changed:
+                    run(script)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild python-docx generators section by section on save')
+    parser.add_argument('scripts', nargs='+', help='Generator scripts, e.g. generate_journal_article_v2.py')
+    parser.add_argument('--also-watch', action='append', default=[],
+                        help='Content file read by the generators; a change rebuilds everything')
+    parser.add_argument('--once', action='store_true', help='Build once from the cache and exit')
+    parser.add_argument('--output', help='Output path (single script only; default: its doc.save() target)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    if args.output and len(args.scripts) > 1:
+        parser.error('--output needs a single script')
+    if args.once:
+        for script in args.scripts:
+            _report(script, build(script, args.output, args.cache_dir))
+        return
+    watch(args.scripts, args.also_watch, args.cache_dir, args.output)
+
+
+if __name__ == "__main__":
+    main()
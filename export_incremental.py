@@ -0,0 +1,191 @@
+import argparse
+import gzip
+import json
+import os
+
+# Incremental export of Supabase tables into a local compressed store.
+#
+# Each table is paged by its watermark column with keyset pagination on
+# (watermark, id), so a nightly run only reads rows created/updated since the
+# previous run instead of re-scanning the whole table.
+#
+# Store layout:
+#   <store>/watermarks.json                  last exported (watermark, id) per table
+#   <store>/<table>/000001.jsonl.gz          append-only segments, one per run
+#
+# Edits are picked up through updated_at columns and deletes through the
+# deleted_rows tombstone table, both maintained by triggers from
+# supabase_export.sql; read_table() drops tombstoned rows.
+#
+# Works against any Postgres reachable through DATABASE_URL (Supabase or a
+# local Postgres started for testing).
+
+TOMBSTONES = 'deleted_rows'
+
+# table -> column used as the watermark
+TABLES = {
+    'families': 'updated_at',
+    'family_members': 'updated_at',
+    'family_visits': 'updated_at',
+    'health_measurements': 'created_at',
+    'villages': 'updated_at',
+    'reflections': 'updated_at',
+    'profiles': 'updated_at',
+    'teacher_student_mappings': 'updated_at',
+    TOMBSTONES: 'deleted_at',
+}
+
+DEFAULT_STORE = 'exports'
+PAGE_SIZE = 5000
+# Rows newer than now() - LAG are left for the next run so that transactions
+# still in flight when the export starts cannot be skipped past.
+DEFAULT_LAG_SECONDS = 60
+
+
+def connect(dsn=None):
+    import psycopg2
+
+    dsn = dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise RuntimeError('DATABASE_URL is not set')
+    return psycopg2.connect(dsn)
+
+
+def load_watermarks(store):
+    path = os.path.join(store, 'watermarks.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_watermarks(store, watermarks):
+    path = os.path.join(store, 'watermarks.json')
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f, indent=4)
+    os.replace(tmp, path)
+
+
+def _next_segment_path(table_dir):
+    existing = [n for n in os.listdir(table_dir) if n.endswith('.jsonl.gz')]
+    seq = max((int(n.split('.')[0]) for n in existing), default=0) + 1
+    return os.path.join(table_dir, f'{seq:06d}.jsonl.gz')
+
+
+def fetch_pages(conn, table, column, after=None, lag_seconds=DEFAULT_LAG_SECONDS, page_size=PAGE_SIZE):
+    # Yields lists of row dicts ordered by (column, id), starting after the
+    # (watermark, id) pair in `after`.
+    last = after
+    while True:
+        params = [lag_seconds]
+        where = f"{column} IS NOT NULL AND {column} < now() - make_interval(secs => %s)"
+        if last:
+            where += f" AND ({column}, id) > (%s::timestamptz, %s)"
+            params.extend(last)
+        query = f"SELECT * FROM {table} WHERE {where} ORDER BY {column}, id LIMIT %s"
+        params.append(page_size)
+
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            names = [d[0] for d in cur.description]
+            rows = [dict(zip(names, r)) for r in cur.fetchall()]
+
+        if not rows:
+            return
+        yield rows
+        last = [rows[-1][column].isoformat(), str(rows[-1]['id'])]
+        if len(rows) < page_size:
+            return
+
+
+def export_table(conn, store, table, watermarks, lag_seconds=DEFAULT_LAG_SECONDS, page_size=PAGE_SIZE):
+    column = TABLES[table]
+    table_dir = os.path.join(store, table)
+    os.makedirs(table_dir, exist_ok=True)
+
+    after = watermarks.get(table)
+    segment = _next_segment_path(table_dir)
+    tmp = segment + '.tmp'
+    count = 0
+    last = after
+
+    with gzip.open(tmp, 'wt', encoding='utf-8') as out:
+        for rows in fetch_pages(conn, table, column, after, lag_seconds, page_size):
+            for row in rows:
+                out.write(json.dumps(row, default=str, ensure_ascii=False))
+                out.write('\n')
+            count += len(rows)
+            last = [rows[-1][column].isoformat(), str(rows[-1]['id'])]
+
+    if count == 0:
+        os.remove(tmp)
+        return 0
+
+    # Publish the segment before advancing the watermark: a crash in between
+    # only means the same rows are exported again, never that rows are lost.
+    os.replace(tmp, segment)
+    watermarks[table] = last
+    save_watermarks(store, watermarks)
+    return count
+
+
+def export_all(conn, store=DEFAULT_STORE, tables=None, lag_seconds=DEFAULT_LAG_SECONDS, page_size=PAGE_SIZE):
+    os.makedirs(store, exist_ok=True)
+    watermarks = load_watermarks(store)
+    counts = {}
+    for table in tables or TABLES:
+        counts[table] = export_table(conn, store, table, watermarks, lag_seconds, page_size)
+    return counts
+
+
+def _read_segments(store, table):
+    table_dir = os.path.join(store, table)
+    if not os.path.isdir(table_dir):
+        return {}
+    rows = {}
+    for name in sorted(n for n in os.listdir(table_dir) if n.endswith('.jsonl.gz')):
+        with gzip.open(os.path.join(table_dir, name), 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                rows[row['id']] = row
+    return rows
+
+
+def read_table(store, table):
+    # Latest version of every exported row, keyed by id. Later segments win,
+    # so rows updated after their first export are returned in updated form;
+    # rows with a tombstone are left out.
+    rows = _read_segments(store, table)
+    if table != TOMBSTONES and rows:
+        for tombstone in _read_segments(store, TOMBSTONES).values():
+            if tombstone['table_name'] == table:
+                rows.pop(tombstone['row_id'], None)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental export of FAP tables')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Local export directory')
+    parser.add_argument('--table', action='append', choices=list(TABLES), help='Limit to these tables')
+    parser.add_argument('--lag-seconds', type=int, default=DEFAULT_LAG_SECONDS)
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--reset', action='store_true', help='Forget watermarks and re-export everything')
+    args = parser.parse_args()
+
+    if args.reset and os.path.isdir(args.store):
+        save_watermarks(args.store, {})
+
+    conn = connect()
+    try:
+        counts = export_all(conn, args.store, args.table, args.lag_seconds, args.page_size)
+    finally:
+        conn.close()
+
+    for table, count in counts.items():
+        print(f"{table}: {count} new/changed rows")
+    print(f"\n✅ Export complete: {args.store}")
+
+
+if __name__ == "__main__":
+    main()
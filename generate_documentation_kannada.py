@@ -1,4 +1,6 @@
 
+import sys
+
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -144,7 +146,12 @@ def create_kannada_documentation():
     print("Kannada documentation created successfully: FAP_NextGen_Documentation_Kannada_v2.docx")
 
 if __name__ == "__main__":
-    try:
-        create_kannada_documentation()
-    except Exception as e:
-        print(f"Error creating documentation: {e}")
+    if '--watch' in sys.argv:
+        # Rebuild on save, re-rendering only the sections that changed
+        from docx_watch import watch
+        watch([__file__])
+    else:
+        try:
+            create_kannada_documentation()
+        except Exception as e:
+            print(f"Error creating documentation: {e}")
@@ -1,4 +1,6 @@
 
+import sys
+
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -189,7 +191,12 @@ Future development will focus on multi-institutional pilot studies to rigorously
     print("Peer-reviewed journal article (v2) created successfully: FAP_NextGen_Journal_Article_v2.docx")
 
 if __name__ == "__main__":
-    try:
-        create_journal_article_v2()
-    except Exception as e:
-        print(f"Error creating article: {e}")
+    if '--watch' in sys.argv:
+        # Rebuild on save, re-rendering only the sections that changed
+        from docx_watch import watch
+        watch([__file__])
+    else:
+        try:
+            create_journal_article_v2()
+        except Exception as e:
+            print(f"Error creating article: {e}")
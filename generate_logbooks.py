@@ -0,0 +1,330 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date
+from multiprocessing import Manager
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from export_incremental import DEFAULT_STORE, read_table
+
+# Batch generation of student logbooks (.docx) from the local export store
+# (see export_incremental.py). Students are grouped by mentor and the groups
+# are spread across a process pool; progress is streamed back per student.
+#
+# A manifest records every finished logbook with a hash of its input data,
+# so after a crash (or on the next term-end run) only students that are not
+# done yet, or whose data changed, are generated again.
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'data', 'forms', 'registry.json')
+DEFAULT_OUTPUT = 'logbooks'
+MANIFEST = 'manifest.jsonl'
+# Students per pool task; large mentor groups are split so one mentor with
+# many students does not leave the other workers idle.
+CHUNK_SIZE = 10
+UNASSIGNED = 'unassigned'
+
+
+def load_form_titles():
+    with open(REGISTRY_PATH, 'r', encoding='utf-8') as f:
+        return {form['form_id']: form['title'] for form in json.load(f)}
+
+
+def build_bundles(store):
+    # One self-contained dict per student with everything its logbook needs.
+    profiles = read_table(store, 'profiles')
+    families = read_table(store, 'families')
+    members = read_table(store, 'family_members')
+    visits = read_table(store, 'family_visits')
+    reflections = read_table(store, 'reflections')
+    mappings = read_table(store, 'teacher_student_mappings')
+
+    mentor_of = {}
+    for m in mappings.values():
+        if m.get('is_active', True):
+            mentor_of[m['student_id']] = m['teacher_id']
+
+    members_by_family = defaultdict(list)
+    for m in members.values():
+        members_by_family[m['family_id']].append(m)
+    visits_by_family = defaultdict(list)
+    for v in visits.values():
+        visits_by_family[v['family_id']].append(v)
+    families_by_student = defaultdict(list)
+    for f in families.values():
+        families_by_student[f['student_id']].append(f)
+    reflections_by_student = defaultdict(list)
+    for r in reflections.values():
+        reflections_by_student[r['student_id']].append(r)
+
+    bundles = []
+    for p in sorted(profiles.values(), key=lambda p: p.get('full_name') or ''):
+        if p.get('role') != 'student':
+            continue
+        mentor_id = mentor_of.get(p['id'])
+        mentor = profiles.get(mentor_id, {}) if mentor_id else {}
+        student_families = []
+        for f in sorted(families_by_student.get(p['id'], []), key=lambda f: f.get('created_at') or ''):
+            student_families.append({
+                'family': f,
+                'members': sorted(members_by_family.get(f['id'], []), key=lambda m: m.get('created_at') or ''),
+                'visits': sorted(visits_by_family.get(f['id'], []), key=lambda v: v.get('visit_date') or ''),
+            })
+        bundles.append({
+            'student': p,
+            'mentor_id': mentor_id or UNASSIGNED,
+            'mentor_name': mentor.get('full_name') or 'Not assigned',
+            'families': student_families,
+            'reflections': sorted(reflections_by_student.get(p['id'], []), key=lambda r: r.get('reflection_date') or r.get('created_at') or ''),
+        })
+    return bundles
+
+
+def bundle_hash(bundle):
+    payload = json.dumps(bundle, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _safe_name(value):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(value))
+
+
+def output_path(output_dir, bundle):
+    student = bundle['student']
+    name = student.get('registration_number') or student['id']
+    return os.path.join(output_dir, _safe_name(bundle['mentor_id']), f"{_safe_name(name)}.docx")
+
+
+def _add_table(doc, headers, rows):
+    table = doc.add_table(rows=1, cols=len(headers))
+    table.style = 'Table Grid'
+    for cell, header in zip(table.rows[0].cells, headers):
+        cell.text = header
+    for row in rows:
+        for cell, value in zip(table.add_row().cells, row):
+            cell.text = '' if value is None else str(value)
+    return table
+
+
+def create_logbook(bundle, form_titles, path):
+    student = bundle['student']
+    doc = Document()
+
+    # Cover Page
+    title = doc.add_heading('Family Adoption Programme Logbook', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    subtitle = doc.add_paragraph('Department of Community Medicine')
+    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    _add_table(doc, ['Field', 'Details'], [
+        ('Student Name', student.get('full_name') or '-'),
+        ('Registration Number', student.get('registration_number') or '-'),
+        ('Year', student.get('year') or '-'),
+        ('Mentor', bundle['mentor_name']),
+        ('Families Adopted', len(bundle['families'])),
+        ('Reflections', len(bundle['reflections'])),
+        ('Generated On', date.today().isoformat()),
+    ])
+    doc.add_page_break()
+
+    # Families
+    for i, entry in enumerate(bundle['families'], 1):
+        family = entry['family']
+        doc.add_heading(f"Family {i}: {family.get('head_name') or '-'}", level=1)
+        p = doc.add_paragraph()
+        p.add_run('Village/Location: ').bold = True
+        p.add_run(family.get('village') or '-')
+
+        doc.add_heading('Family Members', level=2)
+        if entry['members']:
+            _add_table(doc, ['Name', 'Age/Gender', 'Relationship'], [
+                (m.get('name'), f"{m.get('age') or '-'} / {m.get('gender') or '-'}", m.get('relationship') or m.get('relation') or '-')
+                for m in entry['members']
+            ])
+        else:
+            doc.add_paragraph('No members recorded yet.')
+
+        doc.add_heading('Visit Logbook', level=2)
+        if entry['visits']:
+            rows = []
+            for v in entry['visits']:
+                protocol = (v.get('data') or {}).get('protocol')
+                activity = v.get('activity_type') or 'General Visit'
+                if protocol:
+                    activity += f" ({form_titles.get(protocol, protocol)})"
+                rows.append((v.get('visit_date'), activity, v.get('notes') or '-'))
+            _add_table(doc, ['Date', 'Activity', 'Notes'], rows)
+        else:
+            doc.add_paragraph('No visits recorded yet.')
+        doc.add_page_break()
+
+    # Reflections
+    doc.add_heading('Reflective Journal', level=1)
+    if not bundle['reflections']:
+        doc.add_paragraph('No reflections submitted yet.')
+    for r in bundle['reflections']:
+        doc.add_heading(r.get('title') or 'Reflection', level=2)
+        meta = doc.add_paragraph()
+        meta.add_run(f"Date: {r.get('reflection_date') or '-'}    Status: {r.get('status') or 'Pending'}")
+        if r.get('status') == 'Graded':
+            meta.add_run(f"    Score: {r.get('total_score') or 0}/100")
+
+        gibbs = [
+            ('Description', r.get('gibbs_description')),
+            ('Feelings', r.get('gibbs_feelings')),
+            ('Evaluation', r.get('gibbs_evaluation')),
+            ('Analysis', r.get('gibbs_analysis')),
+            ('Conclusion', r.get('gibbs_conclusion')),
+            ('Action Plan', r.get('gibbs_action_plan')),
+        ]
+        if any(text for _, text in gibbs):
+            for label, text in gibbs:
+                if text:
+                    p = doc.add_paragraph()
+                    p.add_run(f"{label}: ").bold = True
+                    p.add_run(text)
+        else:
+            doc.add_paragraph(r.get('content') or '-')
+
+        if r.get('teacher_feedback'):
+            p = doc.add_paragraph()
+            p.add_run('Mentor Feedback: ').bold = True
+            p.add_run(r['teacher_feedback'])
+
+    # Sign-off
+    doc.add_page_break()
+    doc.add_heading('Certification', level=1)
+    doc.add_paragraph('Certified that the above work was carried out by the student under my supervision.')
+    doc.add_paragraph('\n\nSignature of Mentor: ______________________        Date: ____________')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    doc.save(tmp)
+    os.replace(tmp, path)
+
+
+def generate_chunk(bundles, output_dir, progress):
+    # Runs in a worker process; reports each finished student immediately.
+    form_titles = load_form_titles()
+    for bundle in bundles:
+        path = output_path(output_dir, bundle)
+        try:
+            create_logbook(bundle, form_titles, path)
+            progress.put(('done', bundle['student']['id'], bundle_hash(bundle), path))
+        except Exception as e:
+            progress.put(('error', bundle['student']['id'], str(e), path))
+
+
+def load_manifest(output_dir):
+    done = {}
+    path = os.path.join(output_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                done[entry['student_id']] = entry
+    return done
+
+
+def pending_bundles(bundles, done):
+    todo = []
+    for bundle in bundles:
+        entry = done.get(bundle['student']['id'])
+        if entry and entry['hash'] == bundle_hash(bundle) and os.path.exists(entry['path']):
+            continue
+        todo.append(bundle)
+    return todo
+
+
+def remove_stale(previous, path, output_dir):
+    # A reassigned student's logbook moves to the new mentor's folder; the
+    # copy left under the old mentor would be submitted twice.
+    if not previous or os.path.abspath(previous['path']) == os.path.abspath(path):
+        return
+    if os.path.exists(previous['path']):
+        os.remove(previous['path'])
+    folder = os.path.dirname(previous['path'])
+    if os.path.abspath(folder) != os.path.abspath(output_dir) and os.path.isdir(folder) and not os.listdir(folder):
+        os.rmdir(folder)
+
+
+def shard_by_mentor(bundles, chunk_size=CHUNK_SIZE):
+    by_mentor = defaultdict(list)
+    for bundle in bundles:
+        by_mentor[bundle['mentor_id']].append(bundle)
+    # Largest groups first so the long tasks start early.
+    chunks = []
+    for group in sorted(by_mentor.values(), key=len, reverse=True):
+        for i in range(0, len(group), chunk_size):
+            chunks.append(group[i:i + chunk_size])
+    return chunks
+
+
+def generate_all(store=DEFAULT_STORE, output_dir=DEFAULT_OUTPUT, workers=None, chunk_size=CHUNK_SIZE):
+    bundles = build_bundles(store)
+    done = load_manifest(output_dir)
+    todo = pending_bundles(bundles, done)
+    skipped = len(bundles) - len(todo)
+    if skipped:
+        print(f"Skipping {skipped} students already generated")
+    if not todo:
+        return {'generated': 0, 'skipped': skipped, 'failed': 0}
+
+    os.makedirs(output_dir, exist_ok=True)
+    names = {b['student']['id']: b['student'].get('full_name') or b['student']['id'] for b in todo}
+    generated, failed = 0, 0
+
+    with Manager() as manager, open(os.path.join(output_dir, MANIFEST), 'a', encoding='utf-8') as manifest:
+        progress = manager.Queue()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(generate_chunk, chunk, output_dir, progress) for chunk in shard_by_mentor(todo, chunk_size)}
+
+            def drain():
+                nonlocal generated, failed
+                while True:
+                    try:
+                        status, student_id, detail, path = progress.get_nowait()
+                    except queue.Empty:
+                        return
+                    if status == 'done':
+                        generated += 1
+                        manifest.write(json.dumps({'student_id': student_id, 'hash': detail, 'path': path}) + '\n')
+                        manifest.flush()
+                        remove_stale(done.get(student_id), path, output_dir)
+                        print(f"[{generated + failed}/{len(todo)}] ✅ {names[student_id]}")
+                    else:
+                        failed += 1
+                        print(f"[{generated + failed}/{len(todo)}] ❌ {names[student_id]}: {detail}")
+
+            while futures:
+                finished, futures = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+                drain()
+            drain()
+
+    return {'generated': generated, 'skipped': skipped, 'failed': failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate student logbooks in bulk')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Export store from export_incremental.py')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Output directory')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    result = generate_all(args.store, args.output, args.workers, args.chunk_size)
+    print(f"\n✅ Logbooks generated: {result['generated']} (skipped {result['skipped']}, failed {result['failed']})")
+
+
+if __name__ == "__main__":
+    main()
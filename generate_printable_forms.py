@@ -0,0 +1,217 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+from docx import Document
+from docx.shared import Pt, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+# Renders every form in registry.json as a printable blank paper form
+# (.docx, plus .pdf when LibreOffice is available) for field teams working
+# without connectivity.
+#
+# Outputs are cached by a hash of each form's JSON, so after add_forms.py
+# changes the registry only new or edited forms are rendered again.
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'data', 'forms', 'registry.json')
+DEFAULT_OUTPUT = 'printable_forms'
+CACHE_FILE = 'cache.json'
+# Bump when the layout below changes so cached forms are re-rendered.
+RENDERER_VERSION = 1
+
+BOX = '☐'
+LINE = '_' * 40
+
+
+def load_registry(path=REGISTRY_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def form_hash(form):
+    payload = json.dumps({'form': form, 'renderer': RENDERER_VERSION}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _hint(paragraph, text):
+    run = paragraph.add_run(text)
+    run.italic = True
+    run.font.size = Pt(8)
+    run.font.color.rgb = RGBColor(0x64, 0x74, 0x8B)
+
+
+def _range_hint(field):
+    parts = []
+    if 'min' in field and 'max' in field:
+        parts.append(f"range {field['min']}–{field['max']}")
+    elif 'min' in field:
+        parts.append(f"min {field['min']}")
+    elif 'max' in field:
+        parts.append(f"max {field['max']}")
+    if 'step' in field:
+        parts.append(f"to nearest {field['step']}")
+    return ', '.join(parts)
+
+
+def add_field(doc, number, field):
+    label = f"{number}. {field['label']}"
+    if field.get('required'):
+        label += ' *'
+    p = doc.add_paragraph()
+    p.add_run(label).bold = True
+    p.paragraph_format.space_after = Pt(2)
+
+    field_type = field['type']
+    if field_type == 'select':
+        scores = field.get('scores')
+        for i, option in enumerate(field.get('options', [])):
+            text = f"{BOX} {option}"
+            if scores and i < len(scores):
+                text += f" ({scores[i]})"
+            opt = doc.add_paragraph(text)
+            opt.paragraph_format.left_indent = Pt(18)
+            opt.paragraph_format.space_after = Pt(0)
+    elif field_type == 'checkbox':
+        opt = doc.add_paragraph(f"{BOX} Yes      {BOX} No")
+        opt.paragraph_format.left_indent = Pt(18)
+    elif field_type == 'textarea':
+        for _ in range(3):
+            doc.add_paragraph(LINE * 2).paragraph_format.space_after = Pt(0)
+    elif field_type == 'date':
+        doc.add_paragraph('____ / ____ / ________   (DD / MM / YYYY)')
+    elif field_type == 'number':
+        line = doc.add_paragraph('__________   ')
+        hint = _range_hint(field)
+        if hint:
+            _hint(line, f"({hint})")
+    else:
+        doc.add_paragraph(LINE)
+
+    if field.get('placeholder'):
+        _hint(doc.add_paragraph(), f"e.g. {field['placeholder']}")
+    if field.get('help'):
+        _hint(doc.add_paragraph(), field['help'])
+
+
+def create_form_document(form, path):
+    doc = Document()
+
+    title = doc.add_heading(form['title'], 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    if form.get('description'):
+        subtitle = doc.add_paragraph(form['description'])
+        subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Identification block so the sheet can be entered into the app later
+    table = doc.add_table(rows=2, cols=4)
+    table.style = 'Table Grid'
+    for cell, text in zip(table.rows[0].cells + table.rows[1].cells, [
+        'Family / Head:', '', 'Member:', '',
+        'Student:', '', 'Date:', '',
+    ]):
+        cell.text = text
+    doc.add_paragraph()
+
+    for i, field in enumerate(form['fields'], 1):
+        add_field(doc, i, field)
+
+    if form.get('auto_calculate'):
+        doc.add_heading('Calculated (fill after visit)', level=2)
+        for name in form['auto_calculate']:
+            doc.add_paragraph(f"{name.replace('_', ' ').upper()}: __________")
+
+    footer = doc.add_paragraph()
+    _hint(footer, f"* Required field    Form ID: {form['form_id']}")
+
+    tmp = path + '.tmp'
+    doc.save(tmp)
+    os.replace(tmp, path)
+
+
+def find_soffice():
+    return shutil.which('soffice') or shutil.which('libreoffice')
+
+
+def convert_to_pdf(soffice, paths, output_dir):
+    # One LibreOffice call for the whole batch; starting soffice dominates.
+    subprocess.run(
+        [soffice, '--headless', '--convert-to', 'pdf', '--outdir', output_dir] + paths,
+        check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def load_cache(output_dir):
+    path = os.path.join(output_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_cache(output_dir, cache):
+    path = os.path.join(output_dir, CACHE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+def generate_forms(output_dir=DEFAULT_OUTPUT, registry_path=REGISTRY_PATH, pdf=True, force=False):
+    os.makedirs(output_dir, exist_ok=True)
+    soffice = find_soffice() if pdf else None
+    if pdf and not soffice:
+        print("⚠️ LibreOffice not found, skipping PDF conversion")
+    registry = load_registry(registry_path)
+    cache = {} if force else load_cache(output_dir)
+    rendered, unchanged = [], []
+
+    for form in registry:
+        form_id = form['form_id']
+        digest = form_hash(form)
+        docx_path = os.path.join(output_dir, f"{form_id}.docx")
+        pdf_path = os.path.join(output_dir, f"{form_id}.pdf")
+        entry = cache.get(form_id, {})
+        if entry.get('hash') == digest and os.path.exists(docx_path) and (not soffice or os.path.exists(pdf_path)):
+            unchanged.append(form_id)
+            continue
+        create_form_document(form, docx_path)
+        cache[form_id] = {'hash': digest, 'title': form['title']}
+        rendered.append(form_id)
+
+    if soffice and rendered:
+        convert_to_pdf(soffice, [os.path.join(output_dir, f"{f}.docx") for f in rendered], output_dir)
+
+    # Forms removed from the registry
+    current = {form['form_id'] for form in registry}
+    removed = [f for f in cache if f not in current]
+    for form_id in removed:
+        for ext in ('docx', 'pdf'):
+            stale = os.path.join(output_dir, f"{form_id}.{ext}")
+            if os.path.exists(stale):
+                os.remove(stale)
+        del cache[form_id]
+
+    save_cache(output_dir, cache)
+    return {'rendered': rendered, 'unchanged': unchanged, 'removed': removed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render registry forms as printable paper forms')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Output directory')
+    parser.add_argument('--registry', default=REGISTRY_PATH, help='Path to registry.json')
+    parser.add_argument('--no-pdf', action='store_true', help='Only write .docx files')
+    parser.add_argument('--force', action='store_true', help='Ignore the cache and render every form')
+    args = parser.parse_args()
+
+    result = generate_forms(args.output, args.registry, pdf=not args.no_pdf, force=args.force)
+    for form_id in result['rendered']:
+        print(f"Rendered: {form_id}")
+    for form_id in result['removed']:
+        print(f"Removed: {form_id}")
+    print(f"\n✅ {len(result['rendered'])} forms rendered, {len(result['unchanged'])} unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+# Media worker for the upload buckets ('reflection-files', 'family-photos').
+#
+# Every new object is content-hashed (SHA-256). Identical files uploaded
+# twice share one media_assets row and one set of variants. Images get a
+# small thumbnail and a screen-sized preview, recompressed as progressive
+# JPEG and written to the 'media-variants' bucket under a path derived from
+# the hash, so they can be cached forever. Results are recorded in the
+# tables from supabase_media.sql (or a local JSON manifest for testing).
+#
+# Storage is either a local directory (one sub-directory per bucket) or any
+# S3-compatible endpoint, including Supabase Storage's S3 API and MinIO.
+
+SOURCE_BUCKETS = ['reflection-files', 'family-photos']
+VARIANT_BUCKET = 'media-variants'
+VARIANTS = {
+    'thumb': 256,
+    'preview': 1280,
+}
+JPEG_QUALITY = 72
+IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/gif', 'image/bmp', 'image/tiff'}
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def list(self, bucket):
+        base = os.path.join(self.root, bucket)
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                yield os.path.relpath(os.path.join(dirpath, name), base).replace(os.sep, '/')
+
+    def get(self, bucket, path):
+        with open(os.path.join(self.root, bucket, path), 'rb') as f:
+            return f.read()
+
+    def put(self, bucket, path, data, content_type):
+        target = os.path.join(self.root, bucket, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(target + '.tmp', target)
+
+
+class S3Storage:
+    def __init__(self, endpoint=None, access_key=None, secret_key=None, region=None):
+        import boto3
+
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint or os.environ.get('S3_ENDPOINT'),
+            aws_access_key_id=access_key or os.environ.get('S3_ACCESS_KEY_ID'),
+            aws_secret_access_key=secret_key or os.environ.get('S3_SECRET_ACCESS_KEY'),
+            region_name=region or os.environ.get('S3_REGION', 'us-east-1'),
+        )
+
+    def list(self, bucket):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket):
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+    def get(self, bucket, path):
+        return self.client.get_object(Bucket=bucket, Key=path)['Body'].read()
+
+    def put(self, bucket, path, data, content_type):
+        self.client.put_object(
+            Bucket=bucket, Key=path, Body=data, ContentType=content_type,
+            CacheControl='public, max-age=31536000, immutable',
+        )
+
+
+class JsonRecorder:
+    # Local stand-in for the media_assets / media_objects tables.
+    def __init__(self, path):
+        self.path = path
+        self.state = {'assets': {}, 'objects': {}}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def known_objects(self):
+        return {tuple(key.split('/', 1)) for key in self.state['objects']}
+
+    def known_assets(self):
+        return set(self.state['assets'])
+
+    def record(self, assets, objects):
+        for asset in assets:
+            self.state['assets'][asset['sha256']] = asset
+        for bucket, path, sha in objects:
+            self.state['objects'][f"{bucket}/{path}"] = sha
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class DbRecorder:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def known_objects(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT bucket, path FROM media_objects")
+            return set(cur.fetchall())
+
+    def known_assets(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT sha256 FROM media_assets")
+            return {r[0] for r in cur.fetchall()}
+
+    def record(self, assets, objects):
+        from psycopg2.extras import execute_values
+
+        with self.conn:
+            with self.conn.cursor() as cur:
+                if assets:
+                    execute_values(cur, """
+                        INSERT INTO media_assets (sha256, size_bytes, content_type, width, height, thumb_path, preview_path)
+                        VALUES %s ON CONFLICT (sha256) DO NOTHING
+                    """, [(a['sha256'], a['size_bytes'], a['content_type'], a['width'], a['height'],
+                           a['thumb_path'], a['preview_path']) for a in assets])
+                if objects:
+                    execute_values(cur, """
+                        INSERT INTO media_objects (bucket, path, sha256) VALUES %s
+                        ON CONFLICT (bucket, path) DO UPDATE SET sha256 = EXCLUDED.sha256, processed_at = now()
+                    """, objects)
+
+
+def variant_path(sha, name):
+    return f"{sha[:2]}/{sha}/{name}.jpg"
+
+
+def make_variants(data):
+    # Returns (width, height, {name: jpeg_bytes}) for the original image.
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+        # Let the JPEG decoder downscale by up to 8x while decoding, which is
+        # much cheaper than decoding a 12MP phone photo at full size.
+        img.draft('RGB', (VARIANTS['preview'], VARIANTS['preview']))
+        img = ImageOps.exif_transpose(img)
+        if img.mode == 'P' and 'transparency' in img.info:
+            img = img.convert('RGBA')
+        if img.mode in ('RGBA', 'LA', 'PA'):
+            # JPEG has no alpha; a plain convert('RGB') turns transparent
+            # areas black, so flatten onto white like the page behind it.
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img.convert('RGBA'), mask=img.getchannel('A'))
+            img = background
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        out = {}
+        for name, size in sorted(VARIANTS.items(), key=lambda v: -v[1]):
+            variant = img.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            buf = io.BytesIO()
+            variant.save(buf, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            out[name] = buf.getvalue()
+            img = variant  # derive the smaller variant from the larger one
+    return width, height, out
+
+
+class MediaWorker:
+    def __init__(self, storage, recorder, workers=DEFAULT_WORKERS):
+        self.storage = storage
+        self.recorder = recorder
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._claimed = set()
+
+    def _claim(self, sha):
+        # First thread to see a hash derives its variants; the rest skip.
+        with self._lock:
+            if sha in self._claimed:
+                return False
+            self._claimed.add(sha)
+            return True
+
+    def process_object(self, bucket, path):
+        data = self.storage.get(bucket, path)
+        sha = hashlib.sha256(data).hexdigest()
+        if not self._claim(sha):
+            return bucket, path, sha, None
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        asset = {
+            'sha256': sha, 'size_bytes': len(data), 'content_type': content_type,
+            'width': None, 'height': None, 'thumb_path': None, 'preview_path': None,
+        }
+        if content_type in IMAGE_TYPES:
+            try:
+                asset['width'], asset['height'], variants = make_variants(data)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                variants = {}  # corrupt or unsupported image: record hash only
+            for name, payload in variants.items():
+                target = variant_path(sha, name)
+                self.storage.put(VARIANT_BUCKET, target, payload, 'image/jpeg')
+                asset[f'{name}_path'] = target
+        return bucket, path, sha, asset
+
+    def run(self, buckets=SOURCE_BUCKETS, batch_size=200):
+        known = self.recorder.known_objects()
+        self._claimed = set(self.recorder.known_assets())
+        pending = [(b, p) for b in buckets for p in self.storage.list(b) if (b, p) not in known]
+
+        stats = {'objects': len(pending), 'new_assets': 0, 'duplicates': 0, 'bytes_in': 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                results = list(pool.map(lambda item: self.process_object(*item), chunk))
+                assets = [a for _, _, _, a in results if a]
+                objects = [(b, p, sha) for b, p, sha, _ in results]
+                # Assets before objects: media_objects references media_assets.
+                self.recorder.record(assets, objects)
+                stats['new_assets'] += len(assets)
+                stats['duplicates'] += len(results) - len(assets)
+                stats['bytes_in'] += sum(a['size_bytes'] for a in assets)
+                print(f"Processed {min(start + batch_size, len(pending))}/{len(pending)} objects")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deduplicate uploads and build thumbnails/previews')
+    parser.add_argument('--local-root', help='Use this directory (one sub-directory per bucket) instead of S3')
+    parser.add_argument('--manifest', help='Record results in this JSON file instead of DATABASE_URL')
+    parser.add_argument('--bucket', action='append', help='Source bucket(s) (default: reflection-files, family-photos)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    storage = LocalStorage(args.local_root) if args.local_root else S3Storage()
+    conn = None
+    if args.manifest:
+        recorder = JsonRecorder(args.manifest)
+    else:
+        from export_incremental import connect
+
+        conn = connect()
+        recorder = DbRecorder(conn)
+
+    try:
+        stats = MediaWorker(storage, recorder, args.workers).run(args.bucket or SOURCE_BUCKETS)
+    finally:
+        if conn:
+            conn.close()
+
+    print(f"\n✅ {stats['objects']} new objects: {stats['new_assets']} new files, "
+          f"{stats['duplicates']} duplicates, {stats['bytes_in'] / 1e6:.1f} MB originals processed")
+
+
+if __name__ == "__main__":
+    main()
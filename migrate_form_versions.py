@@ -0,0 +1,435 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+from collections import Counter, defaultdict
+
+from export_incremental import DEFAULT_STORE, TOMBSTONES, connect, read_table
+
+# Migrates stored visit payloads (family_visits.data) from one form version
+# to the next, e.g. phq9_depression_screening_v1 -> phq9_depression_screening_v2.
+#
+#   1. plan:  diff the two form definitions into field-level operations
+#             (rename, convert, map_options, drop, add). The plan is plain
+#             JSON so it can be reviewed and hand-edited before use.
+#   2. apply: stream visits in batches from the export store or the
+#             database, transform those recorded with the old form, and
+#             write them to a new export segment or back to the database.
+#             --dry-run only reports what would change.
+#
+# Memory stays bounded by the batch size whatever the number of visits (the
+# store mode additionally keeps an id -> latest position index, no payloads).
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'data', 'forms', 'registry.json')
+BATCH_SIZE = 1000
+MAX_SAMPLES = 5
+
+TRUE_VALUES = {'yes', 'true', '1', 'y', 'on'}
+FALSE_VALUES = {'no', 'false', '0', 'n', 'off', ''}
+
+
+def load_registry(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {form['form_id']: form for form in json.load(f)}
+
+
+def base_form_id(form_id):
+    return re.sub(r'_v\d+$', '', form_id)
+
+
+def form_version(form_id):
+    match = re.search(r'_v(\d+)$', form_id)
+    return int(match.group(1)) if match else 0
+
+
+def find_successor(old_registry, new_registry, form_id):
+    # Same base name with a higher _vN suffix in the new registry.
+    candidates = [
+        fid for fid in new_registry
+        if base_form_id(fid) == base_form_id(form_id) and form_version(fid) > form_version(form_id)
+    ]
+    return max(candidates, key=form_version) if candidates else None
+
+
+def _norm_label(label):
+    # Ignore numbering ("1. ") and case/punctuation when matching labels.
+    label = re.sub(r'^\s*\d+[.)]\s*', '', label or '')
+    return re.sub(r'[^a-z0-9]+', ' ', label.lower()).strip()
+
+
+def _option_mapping(old_options, new_options):
+    mapping, unmapped = {}, []
+    new_set = set(new_options)
+    by_lower = {o.lower(): o for o in new_options}
+    # Map by position only for a pure relabel: same length and exactly one
+    # index changed. A shifted scale (['None', 'Mild', 'Severe'] ->
+    # ['Mild', 'Moderate', 'Severe']) would otherwise map None -> Mild.
+    changed = [i for i, (o, n) in enumerate(zip(old_options, new_options)) if o.lower() != n.lower()]
+    positional = len(old_options) == len(new_options) and len(changed) == 1
+    for i, option in enumerate(old_options):
+        if option in new_set:
+            continue
+        if option.lower() in by_lower:
+            mapping[option] = by_lower[option.lower()]
+        elif positional:
+            mapping[option] = new_options[i]
+        else:
+            unmapped.append(option)
+    return mapping, unmapped
+
+
+def diff_forms(old_form, new_form, overrides=None):
+    overrides = overrides or {}
+    old_fields = {f['key']: f for f in old_form['fields']}
+    new_fields = {f['key']: f for f in new_form['fields']}
+    removed = [k for k in old_fields if k not in new_fields]
+    added = [k for k in new_fields if k not in old_fields]
+
+    # Renames: explicit overrides first, then identical labels, then an
+    # identical (type, options) signature when that pairing is unambiguous.
+    renames = dict(overrides.get('renames', {}))
+    for old_key in removed:
+        if old_key in renames:
+            continue
+        free = [k for k in added if k not in renames.values()]
+        same_label = [k for k in free if _norm_label(new_fields[k]['label']) == _norm_label(old_fields[old_key]['label'])]
+        if len(same_label) == 1:
+            renames[old_key] = same_label[0]
+            continue
+        signature = lambda f: (f['type'], tuple(f.get('options', [])))
+        if old_fields[old_key].get('options'):
+            same_shape = [k for k in free if signature(new_fields[k]) == signature(old_fields[old_key])]
+            if len(same_shape) == 1:
+                renames[old_key] = same_shape[0]
+
+    operations = []
+    for old_key, new_key in renames.items():
+        operations.append({'op': 'rename', 'from': old_key, 'to': new_key})
+
+    pairs = [(k, k) for k in old_fields if k in new_fields] + list(renames.items())
+    option_overrides = overrides.get('option_maps', {})
+    for old_key, new_key in pairs:
+        old_field, new_field = old_fields[old_key], new_fields[new_key]
+        if old_field['type'] != new_field['type']:
+            operations.append({'op': 'convert', 'key': new_key, 'from_type': old_field['type'], 'to_type': new_field['type']})
+        if new_field.get('options') and old_field.get('options') != new_field['options']:
+            mapping, unmapped = _option_mapping(old_field.get('options', []), new_field['options'])
+            mapping.update(option_overrides.get(new_key, {}))
+            unmapped = [o for o in unmapped if o not in mapping]
+            if mapping or unmapped:
+                operations.append({'op': 'map_options', 'key': new_key, 'mapping': mapping, 'unmapped': unmapped})
+
+    for key in removed:
+        if key not in renames:
+            operations.append({'op': 'drop', 'key': key})
+
+    defaults = overrides.get('defaults', {})
+    for key in added:
+        if key in renames.values():
+            continue
+        field = new_fields[key]
+        op = {'op': 'add', 'key': key, 'required': bool(field.get('required'))}
+        if key in defaults:
+            op['default'] = defaults[key]
+        operations.append(op)
+
+    return {'from_form': old_form['form_id'], 'to_form': new_form['form_id'], 'operations': operations}
+
+
+def _convert(value, to_type):
+    if value is None:
+        return None
+    if to_type == 'number':
+        number = float(value)
+        return int(number) if number.is_integer() else number
+    if to_type == 'checkbox':
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f"not a yes/no value: {value!r}")
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    return str(value)
+
+
+def compile_plan(plan):
+    # Turns the JSON plan into a single transform(data) -> (data, applied, issues)
+    # function, so per-record work is just a few dict operations.
+    renames = [(op['from'], op['to']) for op in plan['operations'] if op['op'] == 'rename']
+    converts = [(op['key'], op['to_type']) for op in plan['operations'] if op['op'] == 'convert']
+    option_maps = [(op['key'], op['mapping'], set(op.get('unmapped', []))) for op in plan['operations'] if op['op'] == 'map_options']
+    drops = [op['key'] for op in plan['operations'] if op['op'] == 'drop']
+    adds = [op for op in plan['operations'] if op['op'] == 'add']
+    to_form = plan['to_form']
+
+    def transform(data):
+        data = dict(data)
+        issues = []
+        applied = []
+        for old_key, new_key in renames:
+            if old_key in data:
+                data[new_key] = data.pop(old_key)
+                applied.append('rename')
+        for key, to_type in converts:
+            if key in data:
+                try:
+                    data[key] = _convert(data[key], to_type)
+                    applied.append('convert')
+                except (TypeError, ValueError):
+                    issues.append(('conversion_failed', key))
+        for key, mapping, unmapped in option_maps:
+            value = data.get(key)
+            if value is None or value == '':
+                continue
+            if value in mapping:
+                data[key] = mapping[value]
+                applied.append('map_options')
+            elif value in unmapped:
+                issues.append(('unmapped_option', key))
+        for key in drops:
+            if key in data:
+                del data[key]
+                applied.append('drop')
+        for op in adds:
+            if op['key'] in data:
+                continue
+            if 'default' in op:
+                data[op['key']] = op['default']
+                applied.append('add')
+            elif op['required']:
+                issues.append(('missing_required', op['key']))
+        data['protocol'] = to_form
+        return data, applied, issues
+
+    return transform
+
+
+def _latest_positions(paths):
+    # id -> (segment, line) of its newest copy. Earlier copies are superseded
+    # (read_table() lets later segments win) and must not be migrated again:
+    # a v1 -> v2 run after v2 -> v3 would otherwise write the stale v2 copy
+    # back over v3.
+    latest = {}
+    for seg, path in enumerate(paths):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line_no, line in enumerate(f):
+                latest[json.loads(line)['id']] = (seg, line_no)
+    return latest
+
+
+def iter_store_batches(store, batch_size=BATCH_SIZE):
+    # Segments are read line by line; only one batch is held in memory.
+    # Only the latest copy of each visit is yielded, deleted visits are skipped.
+    paths = sorted(glob.glob(os.path.join(store, 'family_visits', '*.jsonl.gz')))
+    latest = _latest_positions(paths)
+    deleted = {t['row_id'] for t in read_table(store, TOMBSTONES).values() if t['table_name'] == 'family_visits'}
+    batch = []
+    for seg, path in enumerate(paths):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line_no, line in enumerate(f):
+                row = json.loads(line)
+                if latest[row['id']] != (seg, line_no) or row['id'] in deleted:
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def iter_db_batches(conn, form_id, batch_size=BATCH_SIZE):
+    # Named (server-side) cursor so Postgres streams rows instead of
+    # materialising the whole result set on the client.
+    with conn.cursor(name='form_migration') as cur:
+        cur.itersize = batch_size
+        cur.execute("SELECT id, data FROM family_visits WHERE data->>'protocol' = %s ORDER BY id", (form_id,))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [{'id': r[0], 'data': r[1]} for r in rows]
+
+
+class Report:
+    def __init__(self):
+        self.scanned = 0
+        self.matched = 0
+        self.changed = 0
+        self.with_issues = 0
+        self.skipped = 0
+        self.operations = Counter()
+        self.issues = Counter()
+        self.samples = defaultdict(list)
+
+    def record(self, visit_id, applied, issues):
+        self.matched += 1
+        if applied:
+            self.changed += 1
+        self.operations.update(applied)
+        if issues:
+            self.with_issues += 1
+        for kind, key in issues:
+            self.issues[f"{kind}:{key}"] += 1
+            samples = self.samples[f"{kind}:{key}"]
+            if len(samples) < MAX_SAMPLES:
+                samples.append(str(visit_id))
+
+    def as_dict(self):
+        return {
+            'scanned': self.scanned,
+            'matched': self.matched,
+            'changed': self.changed,
+            'with_issues': self.with_issues,
+            'skipped': self.skipped,
+            'operations': dict(self.operations),
+            'issues': {k: {'count': v, 'samples': self.samples[k]} for k, v in self.issues.items()},
+        }
+
+
+def _next_segment(store):
+    table_dir = os.path.join(store, 'family_visits')
+    existing = [n for n in os.listdir(table_dir) if n.endswith('.jsonl.gz')]
+    seq = max((int(n.split('.')[0]) for n in existing), default=0) + 1
+    return os.path.join(table_dir, f'{seq:06d}.jsonl.gz')
+
+
+def apply_plan(plan, batches, sink=None, allow_issues=False):
+    # sink(list_of_migrated_visits) is called once per batch; None = dry run.
+    # Visits with issues keep their old data and form id unless allow_issues:
+    # relabelling them would leave old-version values under the new form.
+    transform = compile_plan(plan)
+    report = Report()
+    for batch in batches:
+        report.scanned += len(batch)
+        migrated = []
+        for visit in batch:
+            data = visit.get('data') or {}
+            if data.get('protocol') != plan['from_form']:
+                continue
+            new_data, applied, issues = transform(data)
+            report.record(visit['id'], applied, issues)
+            if issues and not allow_issues:
+                report.skipped += 1
+                continue
+            migrated.append({**visit, 'data': new_data})
+        if sink and migrated:
+            sink(migrated)
+    return report
+
+
+def migrate_store(plan, store=DEFAULT_STORE, batch_size=BATCH_SIZE, dry_run=False, allow_issues=False):
+    # Migrated rows go to a new segment; read_table() lets later segments
+    # win, so the store then reflects the new form version.
+    if dry_run:
+        return apply_plan(plan, iter_store_batches(store, batch_size), allow_issues=allow_issues)
+    segment = _next_segment(store)
+    tmp = segment + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8') as out:
+        def sink(rows):
+            for row in rows:
+                out.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+        report = apply_plan(plan, iter_store_batches(store, batch_size), sink, allow_issues)
+    if report.matched > report.skipped:
+        os.replace(tmp, segment)
+    else:
+        os.remove(tmp)
+    return report
+
+
+def migrate_db(plan, conn, batch_size=BATCH_SIZE, dry_run=False, allow_issues=False):
+    from psycopg2.extras import Json, execute_batch
+
+    # Updates go through a second connection: committing on `conn` would
+    # close the server-side cursor that is still streaming rows. The
+    # family_visits updated_at trigger (supabase_export.sql) moves the export
+    # watermark, so the next export_incremental run picks the new data up.
+    write_conn = None if dry_run else connect()
+
+    def sink(rows):
+        with write_conn.cursor() as cur:
+            execute_batch(cur, "UPDATE family_visits SET data = %s WHERE id = %s",
+                          [(Json(r['data']), r['id']) for r in rows], page_size=batch_size)
+        write_conn.commit()
+
+    try:
+        return apply_plan(plan, iter_db_batches(conn, plan['from_form'], batch_size), None if dry_run else sink,
+                          allow_issues)
+    finally:
+        if write_conn:
+            write_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate stored visit data between form versions')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_plan = sub.add_parser('plan', help='Diff two registry versions into a migration plan')
+    p_plan.add_argument('--old-registry', required=True, help='registry.json before the change')
+    p_plan.add_argument('--new-registry', default=REGISTRY_PATH)
+    p_plan.add_argument('--form', required=True, help='Old form_id, e.g. phq9_depression_screening_v1')
+    p_plan.add_argument('--to-form', help='New form_id (default: next _vN of the same form)')
+    p_plan.add_argument('--overrides', help='JSON with renames / option_maps / defaults')
+    p_plan.add_argument('--out', help='Write plan here instead of stdout')
+
+    p_apply = sub.add_parser('apply', help='Apply a plan to stored visits')
+    p_apply.add_argument('plan', help='Plan JSON from the plan command')
+    p_apply.add_argument('--store', default=DEFAULT_STORE, help='Export store to migrate')
+    p_apply.add_argument('--db', action='store_true', help='Migrate family_visits in DATABASE_URL instead of the store')
+    p_apply.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    p_apply.add_argument('--dry-run', action='store_true', help='Only report what would change')
+    p_apply.add_argument('--report', help='Write the JSON report here')
+    p_apply.add_argument('--allow-issues', action='store_true',
+                         help='Also migrate visits with conversion/option/required-field issues (skipped by default)')
+
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        old_registry = load_registry(args.old_registry)
+        new_registry = load_registry(args.new_registry)
+        to_form = args.to_form or find_successor(old_registry, new_registry, args.form)
+        if args.form not in old_registry or not to_form or to_form not in new_registry:
+            raise SystemExit(f"❌ Could not find {args.form} -> {to_form or '?'} in the given registries")
+        overrides = {}
+        if args.overrides:
+            with open(args.overrides, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+        plan = diff_forms(old_registry[args.form], new_registry[to_form], overrides)
+        text = json.dumps(plan, indent=4, ensure_ascii=False)
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f"✅ Plan written: {args.out} ({len(plan['operations'])} operations)")
+        else:
+            print(text)
+        return
+
+    with open(args.plan, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    if args.db:
+        conn = connect()
+        try:
+            report = migrate_db(plan, conn, args.batch_size, args.dry_run, args.allow_issues)
+        finally:
+            conn.close()
+    else:
+        report = migrate_store(plan, args.store, args.batch_size, args.dry_run, args.allow_issues)
+
+    result = report.as_dict()
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4)
+    print(json.dumps(result, indent=4))
+    mode = 'Dry run' if args.dry_run else 'Migration'
+    print(f"\n✅ {mode}: {result['matched']} of {result['scanned']} visits use {plan['from_form']}, "
+          f"{result['changed']} changed, {result['with_issues']} need review ({result['skipped']} left unmigrated)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import argparse
+import csv
+import json
+import os
+import re
+import secrets
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from export_incremental import connect
+
+# Bulk onboarding of students and mentors from a CSV roster.
+#
+# The roster is validated as a whole before anything is written. Missing
+# accounts are then created through the Supabase Auth admin API by a small
+# thread pool (GoTrue has no bulk endpoint), and profiles and
+# teacher_student_mappings are written with batched upserts in a single
+# transaction. Re-running the same roster is safe: existing accounts are
+# reused by email, profile fields are updated (blank optional columns keep
+# the stored value) and mappings re-activated. Passwords of new accounts are
+# appended to the credentials file as each account is created.
+# As in TeacherStudentAssignment.jsx, a student keeps one active mentor.
+#
+# Columns (header row required, extra columns ignored):
+#   email, full_name, role                       always
+#   year, registration_number                    students
+#   department, employee_id                      teachers
+#   username, phone, institution, password       optional
+#   mentor_email                                 students, a teacher in the
+#                                                roster or already registered
+#
+# For local testing run `supabase start` (Auth + Postgres), or use
+# --local-auth to keep accounts in a JSON file instead of calling Auth.
+
+ROLES = {'student', 'teacher', 'admin'}
+REQUIRED = {
+    'student': ['year', 'registration_number'],
+    'teacher': ['department', 'employee_id'],
+    'admin': [],
+}
+PROFILE_COLUMNS = [
+    'username', 'full_name', 'email', 'role', 'year', 'registration_number',
+    'department', 'employee_id', 'phone', 'institution',
+]
+# Left blank in a roster row means "keep what the profile already has".
+OPTIONAL_COLUMNS = {'year', 'registration_number', 'department', 'employee_id', 'phone', 'institution'}
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+USERNAME_RE = re.compile(r'^[a-z0-9._-]{3,}$')
+DEFAULT_CONCURRENCY = 8
+BATCH_SIZE = 500
+DEFAULT_CREDENTIALS = 'provisioned_credentials.csv'
+
+
+def profile_upsert_sql(columns):
+    # is_active is only set for new rows so re-running a roster does not
+    # re-activate users an admin has since deactivated.
+    updates = ', '.join(
+        f'{c} = COALESCE(EXCLUDED.{c}, profiles.{c})' if c in OPTIONAL_COLUMNS else f'{c} = EXCLUDED.{c}'
+        for c in columns
+    )
+    return f"""
+INSERT INTO profiles (id, {', '.join(columns)}, is_active)
+VALUES %s
+ON CONFLICT (id) DO UPDATE SET {updates}, updated_at = now()
+"""
+
+
+DEACTIVATE_OTHER_MENTORS_SQL = """
+UPDATE teacher_student_mappings m
+SET is_active = false
+FROM (VALUES %s) AS new(student_id, teacher_id)
+WHERE m.student_id = new.student_id::uuid AND m.teacher_id <> new.teacher_id::uuid AND m.is_active
+"""
+
+MAPPING_UPSERT_SQL = """
+INSERT INTO teacher_student_mappings (teacher_id, student_id, assigned_by, is_active, notes)
+VALUES %s
+ON CONFLICT (teacher_id, student_id) DO UPDATE SET is_active = true, assigned_by = EXCLUDED.assigned_by
+"""
+
+
+def read_roster(path):
+    # utf-8-sig: rosters exported from Excel start with a BOM.
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        rows = []
+        for line, raw in enumerate(reader, start=2):
+            row = {(k or '').strip().lower(): (v or '').strip() for k, v in raw.items()}
+            row['line'] = line
+            rows.append(row)
+    return rows
+
+
+def validate(rows):
+    # Returns (users, problems). Every row is checked so one run lists all
+    # mistakes in the file.
+    problems = []
+    users = []
+    seen = {'email': {}, 'username': {}, 'registration_number': {}, 'employee_id': {}}
+
+    for row in rows:
+        where = f"line {row['line']}"
+        user = {c: row.get(c) or None for c in PROFILE_COLUMNS + ['mentor_email', 'password']}
+        user['line'] = row['line']
+        user['email'] = (user['email'] or '').lower() or None
+        user['role'] = (user['role'] or '').lower() or None
+        user['mentor_email'] = (user['mentor_email'] or '').lower() or None
+        if user['email'] and not user['username']:
+            user['username'] = user['email'].split('@')[0]
+        if user['username']:
+            user['username'] = user['username'].lower()
+
+        if not user['email'] or not EMAIL_RE.match(user['email']):
+            problems.append(f"{where}: invalid email {row.get('email')!r}")
+        if not user['full_name']:
+            problems.append(f"{where}: full_name is required")
+        if user['role'] not in ROLES:
+            problems.append(f"{where}: role must be one of {sorted(ROLES)}, got {row.get('role')!r}")
+            continue
+        if user['username'] and not USERNAME_RE.match(user['username']):
+            problems.append(f"{where}: username {user['username']!r} may only use a-z, 0-9, '.', '_', '-'")
+        for column in REQUIRED[user['role']]:
+            if not user[column]:
+                problems.append(f"{where}: {column} is required for {user['role']}s")
+        if user['year'] is not None:
+            if user['year'] not in ('1', '2', '3'):
+                problems.append(f"{where}: year must be 1, 2 or 3")
+            else:
+                user['year'] = int(user['year'])
+        if user['mentor_email'] and user['role'] != 'student':
+            problems.append(f"{where}: only students can have a mentor_email")
+        if user['password'] and len(user['password']) < 6:
+            problems.append(f"{where}: password must be at least 6 characters")
+
+        for column, first_seen in seen.items():
+            value = user[column]
+            if value is None:
+                continue
+            if value in first_seen:
+                problems.append(f"{where}: duplicate {column} {value!r} (also on line {first_seen[value]})")
+            else:
+                first_seen[value] = row['line']
+        users.append(user)
+
+    roles = {u['email']: u['role'] for u in users}
+    for user in users:
+        mentor = user['mentor_email']
+        if mentor and mentor in roles and roles[mentor] != 'teacher':
+            problems.append(f"line {user['line']}: mentor {mentor} is a {roles[mentor]}, not a teacher")
+    return users, problems
+
+
+class SupabaseAuth:
+    def __init__(self, url=None, service_key=None):
+        self.url = (url or os.environ.get('SUPABASE_URL') or os.environ.get('VITE_SUPABASE_URL', '')).rstrip('/')
+        self.key = service_key or os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
+        if not self.url or not self.key:
+            raise SystemExit('❌ SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set (or use --local-auth)')
+
+    def _request(self, method, path, body=None):
+        request = urllib.request.Request(
+            f"{self.url}/auth/v1{path}",
+            data=json.dumps(body).encode('utf-8') if body is not None else None,
+            method=method,
+            headers={
+                'apikey': self.key,
+                'Authorization': f'Bearer {self.key}',
+                'Content-Type': 'application/json',
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode('utf-8', 'replace')
+            raise RuntimeError(f"Auth {method} {path} failed ({e.code}): {detail}") from None
+
+    def existing_users(self):
+        # email -> user id, across all pages of the admin listing.
+        users, page = {}, 1
+        while True:
+            batch = self._request('GET', f'/admin/users?page={page}&per_page=1000').get('users', [])
+            for u in batch:
+                if u.get('email'):
+                    users[u['email'].lower()] = u['id']
+            if len(batch) < 1000:
+                return users
+            page += 1
+
+    def create_user(self, email, password, metadata):
+        user = self._request('POST', '/admin/users', {
+            'email': email,
+            'password': password,
+            'email_confirm': True,
+            'user_metadata': metadata,
+        })
+        return user['id']
+
+
+class LocalAuth:
+    # Local stand-in for the Auth admin API: accounts kept in a JSON file.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.users = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.users = json.load(f)
+
+    def existing_users(self):
+        return {email: u['id'] for email, u in self.users.items()}
+
+    def create_user(self, email, password, metadata):
+        with self.lock:
+            if email in self.users:
+                raise RuntimeError(f"{email} already registered")
+            self.users[email] = {'id': str(uuid.uuid4()), 'user_metadata': metadata}
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.users, f, indent=4)
+            os.replace(self.path + '.tmp', self.path)
+            return self.users[email]['id']
+
+
+def find_conflicts(cur, users, auth_ids):
+    # Unique profile columns already taken by a different account.
+    problems = []
+    for column in ('username', 'registration_number', 'employee_id'):
+        values = [u[column] for u in users if u[column]]
+        if not values:
+            continue
+        cur.execute(f"SELECT {column}, id FROM profiles WHERE {column} = ANY(%s)", (values,))
+        owners = {value: str(owner) for value, owner in cur.fetchall()}
+        for u in users:
+            owner = owners.get(u[column])
+            if owner and owner != auth_ids.get(u['email']):
+                problems.append(f"line {u['line']}: {column} {u[column]!r} already belongs to another user")
+    return problems
+
+
+def resolve_mentors(cur, users, auth_ids):
+    # mentor_email -> teacher id for mentors outside the roster.
+    outside = sorted({u['mentor_email'] for u in users if u['mentor_email']} - {u['email'] for u in users})
+    if not outside:
+        return {}, []
+    cur.execute("SELECT lower(email), id FROM profiles WHERE role = 'teacher' AND lower(email) = ANY(%s)", (outside,))
+    found = {email: str(teacher_id) for email, teacher_id in cur.fetchall()}
+    problems = [
+        f"line {u['line']}: mentor {u['mentor_email']} is not in the roster or registered as a teacher"
+        for u in users if u['mentor_email'] in outside and u['mentor_email'] not in found
+    ]
+    return found, problems
+
+
+def create_accounts(auth, users, existing, concurrency=DEFAULT_CONCURRENCY, on_created=None):
+    # Creates missing auth users with bounded concurrency. on_created(user,
+    # password) runs as soon as each account exists, from the worker thread.
+    # Returns ({email: id}, [(user, password), ...] created, [problem, ...]).
+    pending = [u for u in users if u['email'] not in existing]
+    ids = {u['email']: existing[u['email']] for u in users if u['email'] in existing}
+
+    def create(user):
+        password = user['password'] or secrets.token_urlsafe(12)
+        metadata = {'username': user['username'], 'full_name': user['full_name'], 'role': user['role']}
+        try:
+            user_id = auth.create_user(user['email'], password, metadata)
+        except Exception as e:
+            return user, password, None, f"line {user['line']}: could not create {user['email']}: {e}"
+        if on_created:
+            on_created(user, password)
+        return user, password, user_id, None
+
+    created, problems = [], []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for user, password, user_id, problem in pool.map(create, pending):
+            if problem:
+                problems.append(problem)
+                continue
+            ids[user['email']] = user_id
+            created.append((user, password))
+            if len(created) % 25 == 0:
+                print(f"Created {len(created)}/{len(pending)} accounts")
+    return ids, created, problems
+
+
+def write_profiles(cur, users, ids, mentor_ids, assigned_by=None):
+    from psycopg2.extras import execute_values
+
+    # Optional columns nobody in the roster fills are left out of the
+    # statement: institution only exists once supabase_rollups.sql has run.
+    columns = [c for c in PROFILE_COLUMNS if c not in OPTIONAL_COLUMNS or any(u[c] is not None for u in users)]
+    rows = [(ids[u['email']],) + tuple(u[c] for c in columns) + (True,) for u in users if u['email'] in ids]
+    execute_values(cur, profile_upsert_sql(columns), rows, page_size=BATCH_SIZE)
+
+    teachers = dict(mentor_ids)
+    teachers.update({u['email']: ids[u['email']] for u in users if u['role'] == 'teacher' and u['email'] in ids})
+    pairs = [
+        (ids[u['email']], teachers[u['mentor_email']])
+        for u in users if u['mentor_email'] and u['email'] in ids and u['mentor_email'] in teachers
+    ]
+    if pairs:
+        execute_values(cur, DEACTIVATE_OTHER_MENTORS_SQL, pairs, page_size=BATCH_SIZE)
+        execute_values(cur, MAPPING_UPSERT_SQL, [
+            (teacher_id, student_id, assigned_by, True, 'Roster import') for student_id, teacher_id in pairs
+        ], page_size=BATCH_SIZE)
+    return len(rows), len(pairs)
+
+
+class CredentialsFile:
+    # Passwords are only known at creation time, so each one is appended and
+    # flushed to disk the moment its account exists: a crash or a failed
+    # profile write later on must not leave accounts nobody can log into.
+    # Appending keeps the passwords of earlier, interrupted runs.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, user, password):
+        with self.lock:
+            # Plaintext passwords: owner-only, whatever the umask.
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'a', encoding='utf-8', newline='') as f:
+                new = os.fstat(fd).st_size == 0
+                writer = csv.writer(f)
+                if new:
+                    writer.writerow(['email', 'username', 'role', 'password'])
+                writer.writerow([user['email'], user['username'], user['role'], password])
+                f.flush()
+                os.fsync(f.fileno())
+            self.count += 1
+
+
+def provision(conn, auth, users, concurrency=DEFAULT_CONCURRENCY, assigned_by=None, dry_run=False, on_created=None):
+    existing = auth.existing_users()
+    with conn:
+        with conn.cursor() as cur:
+            problems = find_conflicts(cur, users, existing)
+            mentor_ids, mentor_problems = resolve_mentors(cur, users, existing)
+            problems += mentor_problems
+    if problems or dry_run:
+        return {'problems': problems, 'existing': sum(u['email'] in existing for u in users), 'created': []}
+
+    ids, created, problems = create_accounts(auth, users, existing, concurrency, on_created)
+    # Accounts that failed to create are left out; the rest are written and a
+    # re-run picks the failures up.
+    with conn:
+        with conn.cursor() as cur:
+            profiles, mappings = write_profiles(cur, users, ids, mentor_ids, assigned_by)
+    return {
+        'problems': problems,
+        'existing': len(users) - len(created) - len(problems),
+        'created': created,
+        'profiles': profiles,
+        'mappings': mappings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create accounts, profiles and mentor mappings from a CSV roster')
+    parser.add_argument('roster', help='CSV roster file')
+    parser.add_argument('--dry-run', action='store_true', help='Validate against the database without writing')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Parallel account creations')
+    parser.add_argument('--assigned-by', help='Admin profile id recorded on new mappings')
+    parser.add_argument('--local-auth', help='Keep accounts in this JSON file instead of calling Supabase Auth')
+    parser.add_argument('--credentials', default=DEFAULT_CREDENTIALS,
+                        help='File the passwords of newly created accounts are appended to')
+    args = parser.parse_args()
+
+    users, problems = validate(read_roster(args.roster))
+    if problems:
+        for problem in problems:
+            print(problem)
+        raise SystemExit(f"\n❌ {len(problems)} problems in {args.roster}; nothing was created")
+
+    auth = LocalAuth(args.local_auth) if args.local_auth else SupabaseAuth()
+    credentials = CredentialsFile(args.credentials)
+    conn = connect()
+    try:
+        result = provision(conn, auth, users, args.concurrency, args.assigned_by, args.dry_run, credentials)
+    finally:
+        conn.close()
+        if credentials.count:
+            print(f"🔑 Passwords for {credentials.count} new accounts written to {args.credentials} "
+                  f"(share securely, then delete)")
+
+    for problem in result['problems']:
+        print(problem)
+
+    if args.dry_run and not result['problems']:
+        print(f"✅ Roster OK: {len(users)} users, {result['existing']} already registered [dry run]")
+    elif 'profiles' in result:
+        print(f"\n{'⚠️' if result['problems'] else '✅'} {len(result['created'])} accounts created, "
+              f"{result['existing']} existing, {result['profiles']} profiles and {result['mappings']} mentor mappings written")
+    if result['problems']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
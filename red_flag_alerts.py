@@ -0,0 +1,299 @@
+import argparse
+import json
+import operator
+import os
+import time
+from collections import defaultdict
+
+from export_incremental import connect
+
+# Clinical red-flag alerts over newly logged visits.
+#
+# Rules live in src/data/forms/alert_rules.json and refer to registry.json
+# field keys. They are compiled once per run into plain Python predicates and
+# indexed by form_id, so each visit only meets the rules of its own form
+# (visit.data.protocol) and select answers are turned into scores through a
+# prebuilt option -> score table. Each run reads only visits created since the
+# last watermark, keeps the latest finding per (rule, person) and upserts it
+# into clinical_alerts (supabase_alerts.sql). Alerts that are new, or that
+# re-trigger after being resolved, are reported grouped by mentor.
+
+FORMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'data', 'forms')
+JOB = 'red_flag_alerts'
+# Overlap between runs so visits committed late are still seen; re-reading a
+# visit is harmless because its alert row already points at it.
+DEFAULT_LAG_SECONDS = 60
+UNASSIGNED = 'unassigned'
+
+OPS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+NEW_VISITS_SQL = """
+SELECT v.id, v.family_id, coalesce(f.student_id, v.student_id) AS student_id, v.data, v.created_at
+FROM family_visits v
+JOIN families f ON f.id = v.family_id
+WHERE (%(since)s::timestamptz IS NULL OR v.created_at >= %(since)s)
+  AND v.data->>'protocol' = ANY(%(forms)s)
+ORDER BY v.created_at, v.id
+"""
+
+# A re-read visit (lag overlap) leaves its alert untouched; a newer visit
+# refreshes it and re-opens it if the mentor had resolved it.
+UPSERT_SQL = """
+INSERT INTO clinical_alerts (rule_id, subject_key, student_id, family_id, member_id, visit_id,
+                             form_id, severity, message, details, opened_at, last_seen_at)
+VALUES %s
+ON CONFLICT (rule_id, subject_key) DO UPDATE SET
+    student_id = EXCLUDED.student_id,
+    visit_id = EXCLUDED.visit_id,
+    severity = EXCLUDED.severity,
+    message = EXCLUDED.message,
+    details = EXCLUDED.details,
+    occurrences = clinical_alerts.occurrences + 1,
+    last_seen_at = EXCLUDED.last_seen_at,
+    opened_at = CASE WHEN clinical_alerts.status = 'resolved' THEN EXCLUDED.last_seen_at
+                     ELSE clinical_alerts.opened_at END,
+    status = CASE WHEN clinical_alerts.status = 'resolved' THEN 'open' ELSE clinical_alerts.status END
+WHERE clinical_alerts.visit_id IS DISTINCT FROM EXCLUDED.visit_id
+RETURNING rule_id, subject_key, opened_at = last_seen_at AS is_new
+"""
+
+
+def load_registry():
+    with open(os.path.join(FORMS_DIR, 'registry.json'), 'r', encoding='utf-8') as f:
+        return {form['form_id']: form for form in json.load(f)}
+
+
+def load_rules(path=None):
+    with open(path or os.path.join(FORMS_DIR, 'alert_rules.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)['rules']
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _reader(field):
+    # data dict -> comparable value (or None when unanswered/unparseable).
+    key = field['key']
+    if field['type'] == 'select' and 'scores' in field:
+        scores = dict(zip(field['options'], field['scores']))
+
+        def read(data):
+            value = data.get(key)
+            # Option labels are stored; bare numbers come from older clients.
+            return scores[value] if value in scores else _number(value)
+        return read
+    if field['type'] == 'number':
+        return lambda data: _number(data.get(key))
+    if field['type'] == 'checkbox':
+        return lambda data: 1 if data.get(key) else 0
+    return lambda data: data.get(key)
+
+
+def _compile_condition(cond, fields, where):
+    # Returns (predicate(data) -> bool, referenced field keys).
+    if 'any' in cond or 'all' in cond:
+        combine = any if 'any' in cond else all
+        parts = [_compile_condition(c, fields, where) for c in cond['any' if 'any' in cond else 'all']]
+        tests = [test for test, _ in parts]
+        keys = [key for _, part_keys in parts for key in part_keys]
+        return (lambda data: combine(test(data) for test in tests)), keys
+
+    if cond.get('op') not in OPS:
+        raise ValueError(f"{where}: unknown operator {cond.get('op')!r}")
+    op, threshold = OPS[cond['op']], cond['value']
+
+    if 'field' in cond:
+        if cond['field'] not in fields:
+            raise ValueError(f"{where}: form has no field {cond['field']!r}")
+        read = _reader(fields[cond['field']])
+
+        def test(data):
+            value = read(data)
+            return value is not None and op(value, threshold)
+        return test, [cond['field']]
+
+    if 'score' in cond:
+        # Sum of scored select answers; unanswered items count as 0 like
+        # calculatePHQ9Score / calculateGAD7Score in riskScoring.js.
+        keys = [k for k, f in fields.items() if 'scores' in f] if cond['score'] == 'all' else cond['score']
+        missing = [k for k in keys if k not in fields]
+        if missing or not keys:
+            raise ValueError(f"{where}: cannot score fields {missing or keys!r}")
+        readers = [_reader(fields[k]) for k in keys]
+        return (lambda data: op(sum(r(data) or 0 for r in readers), threshold)), keys
+
+    raise ValueError(f"{where}: condition needs 'field', 'score', 'any' or 'all'")
+
+
+def compile_rules(rules, registry):
+    # form_id -> [compiled rule, ...]
+    index = defaultdict(list)
+    seen = set()
+    for rule in rules:
+        where = f"alert rule {rule.get('id')!r}"
+        if rule['id'] in seen:
+            raise ValueError(f"{where}: duplicate id")
+        seen.add(rule['id'])
+        form = registry.get(rule['form_id'])
+        if form is None:
+            raise ValueError(f"{where}: unknown form {rule['form_id']!r}")
+        fields = {f['key']: f for f in form['fields']}
+        test, keys = _compile_condition(rule['when'], fields, where)
+        index[rule['form_id']].append({
+            'id': rule['id'],
+            'form_id': rule['form_id'],
+            'severity': rule['severity'],
+            'message': rule['message'],
+            'test': test,
+            'keys': list(dict.fromkeys(keys)),
+        })
+    return dict(index)
+
+
+def evaluate(visits, rules_by_form):
+    # Latest finding per (rule, person); visits must be in created_at order.
+    alerts = {}
+    for visit in visits:
+        data = visit.get('data') or {}
+        rules = rules_by_form.get(data.get('protocol'))
+        if not rules:
+            continue
+        subject = data.get('member_id') or visit['family_id']
+        for rule in rules:
+            if rule['test'](data):
+                alerts[(rule['id'], str(subject))] = {
+                    'rule_id': rule['id'],
+                    'subject_key': str(subject),
+                    'student_id': visit.get('student_id'),
+                    'family_id': visit['family_id'],
+                    'member_id': data.get('member_id'),
+                    'visit_id': visit['id'],
+                    'form_id': rule['form_id'],
+                    'severity': rule['severity'],
+                    'message': rule['message'],
+                    'details': {key: data.get(key) for key in rule['keys']},
+                }
+    return list(alerts.values())
+
+
+def group_by_mentor(alerts, mentors):
+    # mentors: student_id -> [teacher_id, ...]
+    grouped = defaultdict(list)
+    for alert in alerts:
+        for teacher_id in mentors.get(str(alert['student_id']), [UNASSIGNED]):
+            grouped[teacher_id].append(alert)
+    return dict(grouped)
+
+
+def get_watermark(cur):
+    cur.execute("SELECT watermark FROM rollup_state WHERE job = %s", (JOB,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(cur, lag_seconds):
+    cur.execute(
+        """
+        INSERT INTO rollup_state (job, watermark)
+        VALUES (%s, now() - make_interval(secs => %s))
+        ON CONFLICT (job) DO UPDATE SET watermark = EXCLUDED.watermark
+        """,
+        (JOB, lag_seconds),
+    )
+
+
+def fetch_mentors(cur, student_ids):
+    cur.execute(
+        "SELECT student_id, teacher_id FROM teacher_student_mappings "
+        "WHERE is_active = true AND student_id = ANY(%s::uuid[])",
+        (list(student_ids),),
+    )
+    mentors = defaultdict(list)
+    for student_id, teacher_id in cur.fetchall():
+        mentors[str(student_id)].append(str(teacher_id))
+    return mentors
+
+
+def run_alerts(conn, rules_by_form, full=False, dry_run=False, lag_seconds=DEFAULT_LAG_SECONDS):
+    from psycopg2.extras import Json, execute_values
+
+    with conn:
+        with conn.cursor() as cur:
+            since = None if full else get_watermark(cur)
+            cur.execute(NEW_VISITS_SQL, {'since': since, 'forms': list(rules_by_form)})
+            names = [d[0] for d in cur.description]
+            visits = [dict(zip(names, row)) for row in cur.fetchall()]
+
+            alerts = evaluate(visits, rules_by_form)
+            if dry_run:
+                new_alerts = alerts
+            else:
+                if alerts:
+                    cur.execute("SELECT now()")
+                    seen_at = cur.fetchone()[0]
+                    returned = execute_values(cur, UPSERT_SQL, [
+                        (a['rule_id'], a['subject_key'], a['student_id'], a['family_id'], a['member_id'], a['visit_id'],
+                         a['form_id'], a['severity'], a['message'], Json(a['details']), seen_at, seen_at)
+                        for a in alerts
+                    ], fetch=True)
+                    fresh = {(rule_id, subject) for rule_id, subject, is_new in returned if is_new}
+                    new_alerts = [a for a in alerts if (a['rule_id'], a['subject_key']) in fresh]
+                else:
+                    new_alerts = []
+                set_watermark(cur, lag_seconds)
+
+            mentors = fetch_mentors(cur, {str(a['student_id']) for a in new_alerts if a['student_id']})
+
+    return {'visits': len(visits), 'alerts': len(alerts), 'by_mentor': group_by_mentor(new_alerts, mentors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raise clinical red-flag alerts for new visits')
+    parser.add_argument('--rules', help='Alert rules file (default: src/data/forms/alert_rules.json)')
+    parser.add_argument('--full', action='store_true', help='Evaluate every visit, not only those since the last run')
+    parser.add_argument('--dry-run', action='store_true', help='Print alerts without storing them or moving the watermark')
+    parser.add_argument('--validate', action='store_true', help='Only compile the rules against registry.json')
+    parser.add_argument('--out', help='Also write the new alerts per mentor to this JSON file')
+    parser.add_argument('--lag-seconds', type=int, default=DEFAULT_LAG_SECONDS)
+    args = parser.parse_args()
+
+    rules_by_form = compile_rules(load_rules(args.rules), load_registry())
+    if args.validate:
+        print(f"✅ {sum(len(r) for r in rules_by_form.values())} rules compiled for {len(rules_by_form)} forms")
+        return
+
+    started = time.perf_counter()
+    conn = connect()
+    try:
+        result = run_alerts(conn, rules_by_form, full=args.full, dry_run=args.dry_run, lag_seconds=args.lag_seconds)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+
+    for teacher_id, alerts in sorted(result['by_mentor'].items()):
+        print(f"\nMentor {teacher_id}: {len(alerts)} new alerts")
+        for a in sorted(alerts, key=lambda a: (a['severity'] != 'critical', a['rule_id'])):
+            print(f"  [{a['severity']}] {a['rule_id']} student={a['student_id']} visit={a['visit_id']} {a['details']}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result['by_mentor'], f, indent=4, default=str)
+
+    new_count = sum(len(a) for a in result['by_mentor'].values())
+    print(f"\n✅ {result['visits']} visits checked, {result['alerts']} red flags, "
+          f"{new_count} new mentor alerts ({elapsed:.2f}s){' [dry run]' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import argparse
+
+from export_incremental import connect
+
+# Maintains the dashboard rollup tables from supabase_rollups.sql.
+#
+# Each run finds the students whose families, members, visits or reflections
+# changed since the last watermark, plus those marked by the delete triggers
+# in supabase_rollups.sql, and recomputes only their student_rollups rows.
+# Teacher and college rollups are then rebuilt in full from student_rollups
+# (one row per student), never from the raw tables, so mentor reassignments
+# and removals are always reflected. --check compares every stored row
+# against a full recomputation.
+
+JOB = 'dashboard_rollups'
+# Overlap between runs so rows committed late by long transactions are still
+# seen; recomputing a student twice is harmless.
+DEFAULT_LAG_SECONDS = 60
+
+COUNT_COLUMNS = [
+    'families_count',
+    'members_count',
+    'visits_count',
+    'reflections_count',
+    'reflections_pending',
+    'reflections_graded',
+    'graded_score_sum',
+]
+STUDENT_COLUMNS = COUNT_COLUMNS + ['last_visit_date']
+
+# Recomputes student rows from the raw tables. %(ids)s = NULL means everyone.
+STUDENT_ROLLUP_SELECT = """
+SELECT p.id AS student_id,
+       coalesce(f.families_count, 0) AS families_count,
+       coalesce(m.members_count, 0) AS members_count,
+       coalesce(v.visits_count, 0) AS visits_count,
+       coalesce(r.reflections_count, 0) AS reflections_count,
+       coalesce(r.reflections_pending, 0) AS reflections_pending,
+       coalesce(r.reflections_graded, 0) AS reflections_graded,
+       coalesce(r.graded_score_sum, 0) AS graded_score_sum,
+       v.last_visit_date
+FROM profiles p
+LEFT JOIN LATERAL (
+    SELECT count(*) AS families_count FROM families WHERE student_id = p.id
+) f ON true
+LEFT JOIN LATERAL (
+    SELECT count(*) AS members_count
+    FROM family_members fm JOIN families fa ON fa.id = fm.family_id
+    WHERE fa.student_id = p.id
+) m ON true
+LEFT JOIN LATERAL (
+    SELECT count(*) AS visits_count, max(fv.visit_date) AS last_visit_date
+    FROM family_visits fv JOIN families fa ON fa.id = fv.family_id
+    WHERE fa.student_id = p.id
+) v ON true
+LEFT JOIN LATERAL (
+    SELECT count(*) AS reflections_count,
+           count(*) FILTER (WHERE status = 'Pending' OR status IS NULL) AS reflections_pending,
+           count(*) FILTER (WHERE status = 'Graded') AS reflections_graded,
+           coalesce(sum(total_score) FILTER (WHERE status = 'Graded'), 0) AS graded_score_sum
+    FROM reflections WHERE student_id = p.id
+) r ON true
+WHERE p.role = 'student'
+  AND (%(ids)s::uuid[] IS NULL OR p.id = ANY(%(ids)s::uuid[]))
+"""
+
+# New students (no activity yet) and profile edits such as a role change or
+# a new institution are picked up through profiles.created_at/updated_at.
+DIRTY_STUDENTS_SQL = """
+SELECT id FROM profiles WHERE created_at >= %(since)s OR updated_at >= %(since)s
+UNION
+SELECT student_id FROM families WHERE updated_at >= %(since)s OR created_at >= %(since)s
+UNION
+SELECT fa.student_id FROM family_members fm JOIN families fa ON fa.id = fm.family_id
+WHERE fm.created_at >= %(since)s
+UNION
+SELECT fa.student_id FROM family_visits fv JOIN families fa ON fa.id = fv.family_id
+WHERE fv.created_at >= %(since)s
+UNION
+SELECT student_id FROM reflections
+WHERE created_at >= %(since)s OR updated_at >= %(since)s OR graded_at >= %(since)s
+UNION
+SELECT student_id FROM rollup_dirty_students WHERE marked_at >= %(since)s
+"""
+
+_sums = ',\n       '.join(f'coalesce(sum(r.{c}), 0) AS {c}' for c in COUNT_COLUMNS)
+
+TEACHER_ROLLUP_SELECT = f"""
+SELECT m.teacher_id,
+       count(*) AS students_count,
+       {_sums}
+FROM teacher_student_mappings m
+LEFT JOIN student_rollups r ON r.student_id = m.student_id
+WHERE m.is_active = true
+GROUP BY m.teacher_id
+"""
+
+COLLEGE_ROLLUP_SELECT = f"""
+SELECT coalesce(nullif(p.institution, ''), 'Unassigned') AS institution,
+       count(*) AS students_count,
+       {_sums}
+FROM student_rollups r
+JOIN profiles p ON p.id = r.student_id
+GROUP BY 1
+"""
+
+
+def _upsert_sql(table, key, columns, select_sql):
+    cols = ', '.join([key] + columns)
+    updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in columns)
+    return (
+        f"INSERT INTO {table} ({cols})\n{select_sql}\n"
+        f"ON CONFLICT ({key}) DO UPDATE SET {updates}, refreshed_at = now()"
+    )
+
+
+def get_watermark(cur):
+    cur.execute("SELECT watermark FROM rollup_state WHERE job = %s", (JOB,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(cur, lag_seconds):
+    cur.execute(
+        """
+        INSERT INTO rollup_state (job, watermark)
+        VALUES (%s, now() - make_interval(secs => %s))
+        ON CONFLICT (job) DO UPDATE SET watermark = EXCLUDED.watermark
+        """,
+        (JOB, lag_seconds),
+    )
+
+
+def refresh_students(cur, student_ids):
+    cur.execute(
+        _upsert_sql('student_rollups', 'student_id', STUDENT_COLUMNS, STUDENT_ROLLUP_SELECT),
+        {'ids': student_ids},
+    )
+
+
+def drop_former_students(cur):
+    # refresh_students() only upserts students; rows of profiles that are no
+    # longer students (or were deleted) would otherwise stay in every total.
+    cur.execute(
+        "DELETE FROM student_rollups r WHERE NOT EXISTS "
+        "(SELECT 1 FROM profiles p WHERE p.id = r.student_id AND p.role = 'student')"
+    )
+
+
+def refresh_teachers(cur):
+    # Rebuilt in full like the colleges: a mapping flipped to inactive or
+    # moved to another teacher leaves no trace to find it by, and teachers
+    # whose last active mapping went away produce no GROUP BY row.
+    cur.execute("DELETE FROM teacher_rollups")
+    cur.execute(_upsert_sql('teacher_rollups', 'teacher_id', ['students_count'] + COUNT_COLUMNS, TEACHER_ROLLUP_SELECT))
+    return cur.rowcount
+
+
+def refresh_colleges(cur):
+    # Derived from student_rollups (one row per student), so a full rebuild
+    # is cheap and keeps institution changes consistent.
+    cur.execute("DELETE FROM college_rollups")
+    cur.execute(_upsert_sql('college_rollups', 'institution', ['students_count'] + COUNT_COLUMNS, COLLEGE_ROLLUP_SELECT))
+
+
+def run_rollups(conn, full=False, lag_seconds=DEFAULT_LAG_SECONDS):
+    with conn:
+        with conn.cursor() as cur:
+            since = None if full else get_watermark(cur)
+
+            if since is None:
+                refresh_students(cur, None)
+                students = 'all'
+            else:
+                cur.execute(DIRTY_STUDENTS_SQL, {'since': since})
+                student_ids = [str(r[0]) for r in cur.fetchall() if r[0]]
+                if student_ids:
+                    refresh_students(cur, student_ids)
+                students = len(student_ids)
+                # Marks older than this run's window were handled by an earlier run.
+                cur.execute("DELETE FROM rollup_dirty_students WHERE marked_at < %s", (since,))
+
+            drop_former_students(cur)
+            teachers = refresh_teachers(cur)
+            refresh_colleges(cur)
+            set_watermark(cur, lag_seconds)
+
+    return {'students': students, 'teachers': teachers}
+
+
+def _fetch_keyed(cur, sql, params, key):
+    cur.execute(sql, params)
+    names = [d[0] for d in cur.description]
+    return {str(row[names.index(key)]): dict(zip(names, row)) for row in cur.fetchall()}
+
+
+def _diff(label, stored, expected, columns):
+    problems = []
+    for key in sorted(set(stored) | set(expected)):
+        if key not in stored:
+            problems.append(f"{label} {key}: missing rollup row")
+        elif key not in expected:
+            problems.append(f"{label} {key}: stale rollup row")
+        else:
+            for c in columns:
+                if stored[key][c] != expected[key][c]:
+                    problems.append(f"{label} {key}: {c} stored={stored[key][c]} expected={expected[key][c]}")
+    return problems
+
+
+def check_consistency(conn):
+    # Full recomputation compared against what the incremental runs stored.
+    # Teacher/college expectations are built from the recomputed student rows
+    # so a student-level drift is reported once, at the student level.
+    with conn.cursor() as cur:
+        expected_students = _fetch_keyed(cur, STUDENT_ROLLUP_SELECT, {'ids': None}, 'student_id')
+        stored_students = _fetch_keyed(cur, "SELECT * FROM student_rollups", None, 'student_id')
+        stored_teachers = _fetch_keyed(cur, "SELECT * FROM teacher_rollups", None, 'teacher_id')
+        cur.execute("SELECT teacher_id, student_id FROM teacher_student_mappings WHERE is_active = true")
+        mappings = [(str(t), str(s)) for t, s in cur.fetchall()]
+        stored_colleges = _fetch_keyed(cur, "SELECT * FROM college_rollups", None, 'institution')
+        cur.execute("SELECT id, coalesce(nullif(institution, ''), 'Unassigned') FROM profiles WHERE role = 'student'")
+        institutions = {str(i): inst for i, inst in cur.fetchall()}
+
+    def aggregate(groups):
+        totals = {}
+        for group, student_id in groups:
+            row = totals.setdefault(group, dict.fromkeys(['students_count'] + COUNT_COLUMNS, 0))
+            row['students_count'] += 1
+            for c in COUNT_COLUMNS:
+                row[c] += expected_students.get(student_id, {}).get(c, 0)
+        return totals
+
+    expected_teachers = aggregate(mappings)
+    expected_colleges = aggregate((institutions[s], s) for s in expected_students)
+
+    problems = _diff('student', stored_students, expected_students, STUDENT_COLUMNS)
+    problems += _diff('teacher', stored_teachers, expected_teachers, ['students_count'] + COUNT_COLUMNS)
+    problems += _diff('college', stored_colleges, expected_colleges, ['students_count'] + COUNT_COLUMNS)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain dashboard rollup tables')
+    parser.add_argument('--full', action='store_true', help='Recompute every rollup row')
+    parser.add_argument('--check', action='store_true', help='Compare stored rollups with a full recomputation')
+    parser.add_argument('--lag-seconds', type=int, default=DEFAULT_LAG_SECONDS)
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.check:
+            problems = check_consistency(conn)
+            for problem in problems:
+                print(problem)
+            if problems:
+                print(f"\n❌ {len(problems)} rollup mismatches (run with --full to repair)")
+                raise SystemExit(1)
+            print("✅ Rollups match full recomputation")
+            return
+
+        result = run_rollups(conn, full=args.full, lag_seconds=args.lag_seconds)
+    finally:
+        conn.close()
+
+    print(f"Students refreshed: {result['students']}")
+    print(f"Teachers refreshed: {result['teachers']}")
+    print("\n✅ Dashboard rollups updated")
+
+
+if __name__ == "__main__":
+    main()
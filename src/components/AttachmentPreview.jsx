@@ -0,0 +1,31 @@
+import React, { useEffect, useState } from 'react';
+import { getVariantUrl } from '../services/media';
+
+const IMAGE_EXT = /\.(jpe?g|png|webp|gif|bmp|tiff?)$/i;
+
+// Inline image for a reflection attachment, served from the resized copies
+// made by media_worker.py. Renders nothing for non-images or until the
+// variant exists; the original stays available through the download link.
+const AttachmentPreview = ({ url, name, variant = 'preview', style }) => {
+    const [src, setSrc] = useState(null);
+
+    useEffect(() => {
+        let live = true;
+        setSrc(null);
+        if (url && IMAGE_EXT.test(name || url)) {
+            getVariantUrl('reflection-files', url, variant).then(v => { if (live) setSrc(v); });
+        }
+        return () => { live = false; };
+    }, [url, name, variant]);
+
+    if (!src) return null;
+
+    return (
+        <a href={src} target="_blank" rel="noopener noreferrer" onClick={(e) => e.stopPropagation()}>
+            <img src={src} alt={name || 'Attachment'} loading="lazy"
+                style={{ display: 'block', maxWidth: '100%', borderRadius: '8px', ...style }} />
+        </a>
+    );
+};
+
+export default AttachmentPreview;
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import { supabase } from '../services/supabaseClient';
+import { fetchStudentRollups, fetchCohortTotals } from '../services/rollups';
 import {
     GraduationCap, BookOpen, CheckCircle, Users, Home,
     FileText, Star, TrendingUp, RefreshCw, AlertCircle,
@@ -83,13 +84,16 @@ const AdminDashboard = () => {
             const pending = reflections?.filter(r => r.status === 'Pending' || !r.status).length || 0;
             const graded = reflections?.filter(r => r.status === 'Graded').length || 0;
 
+            // Cohort totals from college_rollups; the list above is capped at 200
+            const cohort = await fetchCohortTotals();
+
             setStats({
                 totalStudents: studentCount || 0,
                 totalTeachers: teacherCount || 0,
-                totalFamilies: familyCount || 0,
-                totalReflections: reflections?.length || 0,
-                pendingReflections: pending,
-                gradedReflections: graded
+                totalFamilies: cohort ? cohort.families_count : (familyCount || 0),
+                totalReflections: cohort ? cohort.reflections_count : (reflections?.length || 0),
+                pendingReflections: cohort ? cohort.reflections_pending : pending,
+                gradedReflections: cohort ? cohort.reflections_graded : graded
             });
 
             // Now enrich reflections with student names
@@ -127,8 +131,23 @@ const AdminDashboard = () => {
             console.log('[Admin] Students fetched:', students?.length || 0);
 
             if (students && students.length > 0) {
-                // Batch fetch families count and reflections
+                // Admins may read every rollup row, so no id list is sent
+                const rollups = await fetchStudentRollups(null);
+
                 const enrichedStudents = await Promise.all(students.map(async (s) => {
+                    const rollup = rollups[s.id];
+                    if (rollup) {
+                        return {
+                            ...s,
+                            familyCount: rollup.families_count,
+                            reflectionCount: rollup.reflections_count,
+                            gradedCount: rollup.reflections_graded,
+                            avgScore: rollup.reflections_graded > 0
+                                ? (rollup.graded_score_sum / rollup.reflections_graded).toFixed(1)
+                                : '-'
+                        };
+                    }
+
                     const { count: famCount } = await supabase
                         .from('families')
                         .select('*', { count: 'exact', head: true })
@@ -6,6 +6,7 @@ import { supabase } from '../services/supabaseClient';
 import { useAuth } from '../contexts/AuthContext';
 import DynamicForm from '../components/DynamicForm';
 import { invalidateAnalyticsCache } from '../utils/cacheUtils';
+import { getVariantUrl } from '../services/media';
 import formRegistry from '../data/forms/registry.json';
 
 const FamilyDetails = () => {
@@ -59,6 +60,11 @@ const FamilyDetails = () => {
             };
             setFamily(mappedFam);
 
+            // The header shows an 80px circle; use the worker's thumbnail when ready
+            getVariantUrl('family-photos', famData.photo_url).then(thumbUrl => {
+                if (thumbUrl) setFamily(prev => prev && prev.photoUrl === famData.photo_url ? { ...prev, photoThumbUrl: thumbUrl } : prev);
+            });
+
             // Fetch Members
             const { data: memData, error: memError } = await supabase
                 .from('family_members')
@@ -208,7 +214,7 @@ const FamilyDetails = () => {
             if (dbError) throw dbError;
 
             // 4. Update Local State
-            setFamily(prev => ({ ...prev, photoUrl: publicUrl }));
+            setFamily(prev => ({ ...prev, photoUrl: publicUrl, photoThumbUrl: null }));
             alert("Photo updated successfully!");
 
         } catch (error) {
@@ -250,7 +256,7 @@ const FamilyDetails = () => {
                         {/* Photo Section */}
                         <div style={{ position: 'relative', width: '80px', height: '80px', borderRadius: '50%', overflow: 'hidden', border: '3px solid white', boxShadow: 'var(--shadow-md)', backgroundColor: '#E2E8F0' }}>
                             {family.photoUrl ? (
-                                <img src={family.photoUrl} alt="Family" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
+                                <img src={family.photoThumbUrl || family.photoUrl} alt="Family" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
                             ) : (
                                 <div style={{ width: '100%', height: '100%', display: 'flex', alignItems: 'center', justifyContent: 'center', color: '#94A3B8' }}>
                                     <User size={32} />
@@ -8,6 +8,7 @@ import {
 import { motion, AnimatePresence } from 'framer-motion';
 import { supabase } from '../services/supabaseClient';
 import { useAuth } from '../contexts/AuthContext';
+import AttachmentPreview from '../components/AttachmentPreview';
 import './Reflections.css';
 
 // --- Configuration ---
@@ -516,6 +517,10 @@ const Reflections = () => {
                                                         <Trash2 size={18} />
                                                     </button>
                                                 )}
+                                                {ref.file_url && (
+                                                    <AttachmentPreview url={ref.file_url} name={ref.file_name} variant="thumb"
+                                                        style={{ width: '48px', height: '48px', objectFit: 'cover' }} />
+                                                )}
                                                 {ref.file_url ? (
                                                     <a href={ref.file_url}
                                                         onClick={(e) => e.stopPropagation()}
@@ -788,6 +793,7 @@ const Reflections = () => {
                                 {viewingEntry.reflection_type === 'file' ? (
                                     <div style={{ textAlign: 'center', padding: '3rem' }}>
                                         <p style={{ marginBottom: '1rem' }}>This reflection was submitted as a file.</p>
+                                        <AttachmentPreview url={viewingEntry.file_url} name={viewingEntry.file_name} style={{ margin: '0 auto 1rem' }} />
                                         <a href={viewingEntry.file_url} target="_blank" rel="noopener noreferrer" className="btn btn-primary">
                                             Download {viewingEntry.file_name} <Download size={16} />
                                         </a>
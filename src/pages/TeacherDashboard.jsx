@@ -9,7 +9,9 @@ import {
 } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { supabase } from '../services/supabaseClient';
+import { fetchStudentRollups, fetchTeacherRollup } from '../services/rollups';
 import { useAuth } from '../contexts/AuthContext';
+import AttachmentPreview from '../components/AttachmentPreview';
 import './TeacherDashboard.css';
 
 const REFLECT_CRITERIA = [
@@ -73,14 +75,39 @@ const TeacherDashboard = () => {
         let totalScoreSum = 0;
         let gradedCount = 0;
 
+        const [rollups, classRollup] = await Promise.all([
+            fetchStudentRollups(mappings.map(m => m.student.id)),
+            fetchTeacherRollup(profile.id)
+        ]);
+
         const enhanced = await Promise.all(mappings.map(async (m) => {
             const student = m.student;
+            const rollup = rollups[student.id];
+
+            if (rollup) {
+                totalRefs += rollup.reflections_count;
+                pending += rollup.reflections_pending;
+                totalScoreSum += rollup.graded_score_sum;
+                gradedCount += rollup.reflections_graded;
+
+                return {
+                    ...student,
+                    reflectionCount: rollup.reflections_count,
+                    pendingCount: rollup.reflections_pending,
+                    familyCount: rollup.families_count,
+                    avgGrade: rollup.reflections_graded > 0
+                        ? (rollup.graded_score_sum / rollup.reflections_graded).toFixed(1)
+                        : 0,
+                    progress: Math.min(100, Math.round((rollup.reflections_count / TARGET_REFLECTIONS) * 100))
+                };
+            }
+
             const { data: refs } = await supabase.from('reflections').select('status, total_score').eq('student_id', student.id);
             const { count: famCount } = await supabase.from('families').select('*', { count: 'exact', head: true }).eq('student_id', student.id);
 
             const studentRefs = refs || [];
             const sTotalRefs = studentRefs.length;
-            const sPending = studentRefs.filter(r => r.status === 'Pending').length;
+            const sPending = studentRefs.filter(r => r.status === 'Pending' || !r.status).length;
             const sGraded = studentRefs.filter(r => r.status === 'Graded');
             const sAvg = sGraded.length > 0
                 ? (sGraded.reduce((a, b) => a + (b.total_score || 0), 0) / sGraded.length).toFixed(1)
@@ -100,6 +127,14 @@ const TeacherDashboard = () => {
             };
         }));
 
+        // Class totals straight from teacher_rollups when it is up to date
+        if (classRollup && classRollup.students_count === enhanced.length) {
+            totalRefs = classRollup.reflections_count;
+            pending = classRollup.reflections_pending;
+            totalScoreSum = classRollup.graded_score_sum;
+            gradedCount = classRollup.reflections_graded;
+        }
+
         setStudents(enhanced);
         setStats({
             totalStudents: enhanced.length,
@@ -349,14 +384,17 @@ const TeacherDashboard = () => {
                                                     </div>
 
                                                     {ref.reflection_type === 'file' ? (
-                                                        <div style={{ background: '#F1F5F9', padding: '1rem', borderRadius: '8px', marginBottom: '1rem', display: 'flex', alignItems: 'center', gap: '0.75rem' }}>
-                                                            <FileText size={20} color="#64748B" />
-                                                            <div style={{ flex: 1 }}>
-                                                                <div style={{ fontSize: '0.875rem', fontWeight: 600 }}>{ref.file_name}</div>
-                                                                <div style={{ fontSize: '0.75rem', color: '#64748B' }}>{(ref.file_size / 1024 / 1024).toFixed(2)} MB</div>
+                                                        <>
+                                                            <div style={{ background: '#F1F5F9', padding: '1rem', borderRadius: '8px', marginBottom: '1rem', display: 'flex', alignItems: 'center', gap: '0.75rem' }}>
+                                                                <FileText size={20} color="#64748B" />
+                                                                <div style={{ flex: 1 }}>
+                                                                    <div style={{ fontSize: '0.875rem', fontWeight: 600 }}>{ref.file_name}</div>
+                                                                    <div style={{ fontSize: '0.75rem', color: '#64748B' }}>{(ref.file_size / 1024 / 1024).toFixed(2)} MB</div>
+                                                                </div>
+                                                                <a href={ref.file_url} target="_blank" rel="noopener noreferrer" style={{ color: '#0EA5E9' }} title="Download original"><Download size={18} /></a>
                                                             </div>
-                                                            <a href={ref.file_url} target="_blank" rel="noopener noreferrer" style={{ color: '#0EA5E9' }}><Download size={18} /></a>
-                                                        </div>
+                                                            <AttachmentPreview url={ref.file_url} name={ref.file_name} style={{ marginBottom: '1rem', maxHeight: '240px' }} />
+                                                        </>
                                                     ) : (
                                                         <div className="ref-preview" style={{
                                                             display: 'block', // Override flex/grid
@@ -475,6 +513,7 @@ const TeacherDashboard = () => {
                                     {gradingTarget.reflection_type === 'file' ? (
                                         <div style={{ textAlign: 'center', padding: '1rem' }}>
                                             <p style={{ marginBottom: '0.5rem', fontWeight: 600 }}>{gradingTarget.file_name}</p>
+                                            <AttachmentPreview url={gradingTarget.file_url} name={gradingTarget.file_name} style={{ margin: '0 auto 0.75rem' }} />
                                             <a href={gradingTarget.file_url} target="_blank" rel="noopener noreferrer"
                                                 style={{ display: 'inline-flex', alignItems: 'center', gap: '0.5rem', background: 'white', padding: '0.5rem 1rem', borderRadius: '99px', border: '1px solid #E2E8F0', color: '#0EA5E9', fontWeight: 600 }}>
                                                 <Download size={16} /> Download to Read
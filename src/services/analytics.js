@@ -1,33 +1,65 @@
 import { supabase } from './supabaseClient';
 import formRegistry from '../data/forms/registry.json';
 
+// Optional aggregation service (bundle_service.py): one request instead of
+// sequential families -> members -> visits -> reflections queries.
+const BUNDLE_SERVICE_URL = import.meta.env.VITE_BUNDLE_SERVICE_URL;
+
+const fetchStudentBundle = async (studentId) => {
+    if (!BUNDLE_SERVICE_URL) return null;
+    try {
+        const { data: { session } } = await supabase.auth.getSession();
+        if (!session) return null;
+
+        // The service answers with an ETag; the browser cache revalidates
+        // with If-None-Match and gets a 304 while the data is unchanged.
+        const response = await fetch(`${BUNDLE_SERVICE_URL}/bundle/student/${studentId}`, {
+            headers: { Authorization: `Bearer ${session.access_token}` }
+        });
+        if (!response.ok) return null;
+        return await response.json();
+    } catch (error) {
+        console.warn('Bundle service unavailable, using direct queries:', error);
+        return null;
+    }
+};
+
 export const generateCommunityHealthReport = async (studentId) => {
     let families = [];
     let members = [];
     let visits = [];
-
-    try {
-        // Fetch Families
-        const { data: famData, error: famError } = await supabase
-            .from('families')
-            .select('*')
-            .eq('student_id', studentId);
-
-        if (famError) throw famError;
-        families = famData || [];
-
-        // Fetch Members and Visits if families exist
-        if (families.length > 0) {
-            const familyIds = families.map(f => f.id);
-
-            const { data: memData } = await supabase.from('family_members').select('*').in('family_id', familyIds);
-            members = memData || [];
-
-            const { data: visData } = await supabase.from('family_visits').select('*').in('family_id', familyIds);
-            visits = visData || [];
+    let refCount = null;
+
+    const bundle = await fetchStudentBundle(studentId);
+    if (bundle) {
+        families = bundle.families;
+        members = bundle.members;
+        visits = bundle.visits;
+        refCount = bundle.counts.reflections;
+    } else {
+        try {
+            // Fetch Families
+            const { data: famData, error: famError } = await supabase
+                .from('families')
+                .select('*')
+                .eq('student_id', studentId);
+
+            if (famError) throw famError;
+            families = famData || [];
+
+            // Fetch Members and Visits if families exist
+            if (families.length > 0) {
+                const familyIds = families.map(f => f.id);
+
+                const { data: memData } = await supabase.from('family_members').select('*').in('family_id', familyIds);
+                members = memData || [];
+
+                const { data: visData } = await supabase.from('family_visits').select('*').in('family_id', familyIds);
+                visits = visData || [];
+            }
+        } catch (error) {
+            console.error("Analytics Error:", error);
         }
-    } catch (error) {
-        console.error("Analytics Error:", error);
     }
 
     // Process Members to attach 'assessments' from visits (virtual join for backwards compatibility)
@@ -56,10 +88,13 @@ export const generateCommunityHealthReport = async (studentId) => {
     });
 
     // Fetch Reflections Count
-    const { count: refCount } = await supabase
-        .from('reflections')
-        .select('*', { count: 'exact', head: true })
-        .eq('student_id', studentId);
+    if (refCount === null) {
+        const { count } = await supabase
+            .from('reflections')
+            .select('*', { count: 'exact', head: true })
+            .eq('student_id', studentId);
+        refCount = count;
+    }
 
     const report = {
         demographics: {
@@ -40,6 +40,10 @@ export const initDB = async () => {
     });
 };
 
+// Records created offline get numeric autoIncrement keys; records from a
+// snapshot pack keep their server UUID. Route params arrive as strings.
+const toKey = (id) => (typeof id === 'string' && /^\d+$/.test(id) ? Number(id) : id);
+
 export const addReflection = async (data) => {
     const db = await initDB();
     return db.add('reflections', { ...data, createdAt: new Date() });
@@ -57,7 +61,7 @@ export const getFamilies = async () => {
 
 export const getFamily = async (id) => {
     const db = await initDB();
-    return db.get('families', parseInt(id));
+    return db.get('families', toKey(id));
 };
 
 export const addFamily = async (family) => {
@@ -67,7 +71,7 @@ export const addFamily = async (family) => {
 
 export const getMembers = async (familyId) => {
     const db = await initDB();
-    return db.getAllFromIndex('members', 'familyId', parseInt(familyId));
+    return db.getAllFromIndex('members', 'familyId', toKey(familyId));
 };
 
 export const getAllMembers = async () => {
@@ -102,3 +106,55 @@ export const updateVillage = async (village) => {
     return db.put('villages', { ...village, updatedAt: new Date() });
 };
 
+
+// Offline snapshot packs (see build_snapshots.py)
+// Not called yet: nothing hosts or downloads the packs, and this IndexedDB
+// layer is only used when Supabase is not configured (see supabaseDb.js).
+// A first-sync path would fetch snapshots/<student_id>/latest.json, then the
+// matching delta (or the full pack) and pass the parsed JSON in here.
+const SNAPSHOT_STORES = ['families', 'members', 'visits', 'villages', 'reflections'];
+
+export const getSnapshotVersion = () => localStorage.getItem('snapshot_version');
+
+export const importSnapshot = async (snapshot) => {
+    const db = await initDB();
+    // One transaction for every store: either the whole pack lands or nothing does.
+    // Server records (UUID keys) missing from the pack were deleted upstream and
+    // are dropped; records created offline (numeric keys) are kept for sync.
+    const tx = db.transaction(SNAPSHOT_STORES, 'readwrite');
+    await Promise.all(SNAPSHOT_STORES.map(async (name) => {
+        const store = tx.objectStore(name);
+        const records = snapshot.stores[name] || [];
+        const incoming = new Set(records.map((record) => record.id));
+        const stale = (await store.getAllKeys()).filter((key) => typeof key === 'string' && !incoming.has(key));
+        await Promise.all([
+            ...stale.map((key) => store.delete(key)),
+            ...records.map((record) => store.put(record)),
+        ]);
+    }));
+    await tx.done;
+    if (snapshot.content) {
+        localStorage.setItem('snapshot_content', JSON.stringify(snapshot.content));
+    }
+    localStorage.setItem('snapshot_version', snapshot.version);
+};
+
+export const applySnapshotDelta = async (delta) => {
+    if (delta.from !== getSnapshotVersion()) {
+        throw new Error(`Snapshot delta ${delta.from} -> ${delta.to} does not match local version`);
+    }
+    const db = await initDB();
+    const tx = db.transaction(SNAPSHOT_STORES, 'readwrite');
+    await Promise.all(SNAPSHOT_STORES.map(async (name) => {
+        const store = tx.objectStore(name);
+        await Promise.all([
+            ...(delta.deletes[name] || []).map((id) => store.delete(id)),
+            ...(delta.upserts[name] || []).map((record) => store.put(record)),
+        ]);
+    }));
+    await tx.done;
+    if (delta.content) {
+        localStorage.setItem('snapshot_content', JSON.stringify(delta.content));
+    }
+    localStorage.setItem('snapshot_version', delta.to);
+};
@@ -0,0 +1,31 @@
+import { supabase } from './supabaseClient';
+
+/**
+ * Resized copy of an uploaded image, produced by media_worker.py.
+ * publicUrl is the original's public URL as stored in the row (e.g.
+ * families.photo_url); variant is 'thumb' (256px) or 'preview' (1280px).
+ * Returns null until the worker has processed the upload (or when the media
+ * tables are not installed), so callers keep showing the original.
+ */
+export const getVariantUrl = async (bucket, publicUrl, variant = 'thumb') => {
+    const marker = `/object/public/${bucket}/`;
+    const at = publicUrl ? publicUrl.indexOf(marker) : -1;
+    if (at === -1) return null;
+    const path = decodeURIComponent(publicUrl.slice(at + marker.length).split('?')[0]);
+
+    const { data, error } = await supabase
+        .from('media_objects')
+        .select('media_assets(thumb_path, preview_path)')
+        .eq('bucket', bucket)
+        .eq('path', path)
+        .maybeSingle();
+
+    if (error) {
+        console.warn('Media variants unavailable, using original:', error.message);
+        return null;
+    }
+
+    const variantPath = data?.media_assets?.[`${variant}_path`];
+    if (!variantPath) return null;
+    return supabase.storage.from('media-variants').getPublicUrl(variantPath).data.publicUrl;
+};
@@ -0,0 +1,76 @@
+import { supabase } from './supabaseClient';
+
+// Ids per .in() filter; the list travels in the request URL.
+const ID_CHUNK = 100;
+
+/**
+ * Precomputed per-student totals maintained by rollup_dashboards.py.
+ * Returns a map of student_id -> rollup row. Students without a row (or a
+ * database without the rollup tables) are simply absent, so callers fall
+ * back to counting the raw rows for them. Pass null to read every row the
+ * caller may see (admins), instead of sending the whole cohort's ids.
+ */
+export const fetchStudentRollups = async (studentIds) => {
+    if (studentIds && studentIds.length === 0) return {};
+
+    const chunks = [];
+    if (studentIds) {
+        for (let i = 0; i < studentIds.length; i += ID_CHUNK) chunks.push(studentIds.slice(i, i + ID_CHUNK));
+    } else {
+        chunks.push(null);
+    }
+
+    const results = await Promise.all(chunks.map(ids => {
+        const query = supabase.from('student_rollups').select('*');
+        return ids ? query.in('student_id', ids) : query;
+    }));
+
+    const byStudent = {};
+    for (const { data, error } of results) {
+        if (error) {
+            console.warn('Rollups unavailable, using live counts:', error.message);
+            return {};
+        }
+        (data || []).forEach(r => { byStudent[r.student_id] = r; });
+    }
+    return byStudent;
+};
+
+/**
+ * Class totals for one mentor (active mappings only), or null when the
+ * rollup is missing and the caller should sum the student rows itself.
+ */
+export const fetchTeacherRollup = async (teacherId) => {
+    const { data, error } = await supabase
+        .from('teacher_rollups')
+        .select('*')
+        .eq('teacher_id', teacherId)
+        .maybeSingle();
+
+    if (error) {
+        console.warn('Teacher rollup unavailable, using live counts:', error.message);
+        return null;
+    }
+    return data;
+};
+
+/**
+ * Per-institution totals, summed into one cohort-wide row. Returns null
+ * when the rollup tables are unavailable or empty.
+ */
+export const fetchCohortTotals = async () => {
+    const { data, error } = await supabase.from('college_rollups').select('*');
+
+    if (error) {
+        console.warn('College rollups unavailable, using live counts:', error.message);
+        return null;
+    }
+    if (!data || data.length === 0) return null;
+
+    const totals = { colleges: data };
+    ['students_count', 'families_count', 'members_count', 'visits_count', 'reflections_count',
+        'reflections_pending', 'reflections_graded', 'graded_score_sum'].forEach(c => {
+        totals[c] = data.reduce((sum, r) => sum + (r[c] || 0), 0);
+    });
+    return totals;
+};
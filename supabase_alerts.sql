@@ -0,0 +1,81 @@
+-- ============================================
+-- FAP NextGen - Clinical Red-Flag Alerts
+-- Run this in Supabase SQL Editor
+-- Filled by red_flag_alerts.py from the rules in
+-- src/data/forms/alert_rules.json. One open alert per rule and
+-- person: repeat findings update it instead of adding new rows.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS clinical_alerts (
+  id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
+  rule_id text NOT NULL,
+  -- member_id when the visit names a member, otherwise family_id
+  subject_key text NOT NULL,
+  student_id uuid REFERENCES profiles(id) ON DELETE CASCADE,
+  family_id uuid REFERENCES families(id) ON DELETE CASCADE,
+  member_id uuid REFERENCES family_members(id) ON DELETE SET NULL,
+  visit_id uuid REFERENCES family_visits(id) ON DELETE SET NULL,
+  form_id text NOT NULL,
+  severity text NOT NULL CHECK (severity IN ('critical', 'high')),
+  message text NOT NULL,
+  details jsonb DEFAULT '{}'::jsonb,
+  status text NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'acknowledged', 'resolved')),
+  occurrences integer NOT NULL DEFAULT 1,
+  first_seen_at timestamp with time zone DEFAULT now(),
+  -- set again when a resolved alert re-triggers
+  opened_at timestamp with time zone DEFAULT now(),
+  last_seen_at timestamp with time zone DEFAULT now(),
+  acknowledged_by uuid REFERENCES profiles(id),
+  acknowledged_at timestamp with time zone,
+  UNIQUE (rule_id, subject_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_clinical_alerts_student_open ON clinical_alerts(student_id) WHERE status <> 'resolved';
+
+-- Job watermark (shared with supabase_rollups.sql)
+CREATE TABLE IF NOT EXISTS rollup_state (
+  job text PRIMARY KEY,
+  watermark timestamp with time zone NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_family_visits_created_at ON family_visits(created_at);
+
+-- ============================================
+-- RLS (alerts are written by the service role only;
+-- mentors may acknowledge or resolve them)
+-- ============================================
+ALTER TABLE clinical_alerts ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_state ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Students view own alerts" ON clinical_alerts;
+CREATE POLICY "Students view own alerts" ON clinical_alerts
+  FOR SELECT USING (student_id = auth.uid());
+
+DROP POLICY IF EXISTS "Teachers view student alerts" ON clinical_alerts;
+CREATE POLICY "Teachers view student alerts" ON clinical_alerts
+  FOR SELECT USING (
+    student_id IN (
+      SELECT student_id FROM teacher_student_mappings
+      WHERE teacher_id = auth.uid() AND is_active = true
+    )
+  );
+
+DROP POLICY IF EXISTS "Teachers update student alerts" ON clinical_alerts;
+CREATE POLICY "Teachers update student alerts" ON clinical_alerts
+  FOR UPDATE USING (
+    student_id IN (
+      SELECT student_id FROM teacher_student_mappings
+      WHERE teacher_id = auth.uid() AND is_active = true
+    )
+  );
+
+DROP POLICY IF EXISTS "Admins manage alerts" ON clinical_alerts;
+CREATE POLICY "Admins manage alerts" ON clinical_alerts
+  FOR ALL USING (
+    EXISTS (SELECT 1 FROM profiles WHERE id = auth.uid() AND role = 'admin')
+  );
+
+DO $$
+BEGIN
+  RAISE NOTICE 'Alert table created: clinical_alerts';
+END $$;
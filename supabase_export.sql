@@ -0,0 +1,143 @@
+-- ============================================
+-- FAP NextGen - Incremental Export Support
+-- Run this in Supabase SQL Editor
+-- export_incremental.py pages every table by a watermark column. This
+-- makes sure edits move that column and deletes leave a tombstone, so
+-- nightly exports see every change.
+-- (update_updated_at_column() is defined in supabase_schema.sql)
+-- ============================================
+
+-- ============================================
+-- 1. updated_at ON TABLES THAT ARE EDITED IN PLACE
+-- ============================================
+
+-- family_members.health_data is edited from MemberDetails.jsx
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'family_members' AND column_name = 'updated_at'
+  ) THEN
+    ALTER TABLE family_members ADD COLUMN updated_at timestamp with time zone DEFAULT now();
+    UPDATE family_members SET updated_at = coalesce(created_at, now());
+  END IF;
+END $$;
+
+-- family_visits.data is rewritten in place by migrate_form_versions.py --db
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'family_visits' AND column_name = 'updated_at'
+  ) THEN
+    ALTER TABLE family_visits ADD COLUMN updated_at timestamp with time zone DEFAULT now();
+    UPDATE family_visits SET updated_at = coalesce(created_at, now());
+  END IF;
+END $$;
+
+-- Mentor reassignment/removal only flips is_active
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'teacher_student_mappings' AND column_name = 'updated_at'
+  ) THEN
+    ALTER TABLE teacher_student_mappings ADD COLUMN updated_at timestamp with time zone DEFAULT now();
+    UPDATE teacher_student_mappings SET updated_at = coalesce(assigned_at, now());
+  END IF;
+END $$;
+
+DROP TRIGGER IF EXISTS update_family_visits_updated_at ON family_visits;
+CREATE TRIGGER update_family_visits_updated_at
+    BEFORE UPDATE ON family_visits
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_family_members_updated_at ON family_members;
+CREATE TRIGGER update_family_members_updated_at
+    BEFORE UPDATE ON family_members
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- families and reflections already have updated_at; these triggers also
+-- live in supabase_rollups.sql, so either script alone keeps them current.
+DROP TRIGGER IF EXISTS update_families_updated_at ON families;
+CREATE TRIGGER update_families_updated_at
+    BEFORE UPDATE ON families
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_reflections_updated_at ON reflections;
+CREATE TRIGGER update_reflections_updated_at
+    BEFORE UPDATE ON reflections
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- villages already has updated_at (COMPLETE_SCHEMA.sql) but nothing moved it;
+-- build_snapshots.py ships village profiles edited offline and synced back.
+DROP TRIGGER IF EXISTS update_villages_updated_at ON villages;
+CREATE TRIGGER update_villages_updated_at
+    BEFORE UPDATE ON villages
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_mappings_updated_at ON teacher_student_mappings;
+CREATE TRIGGER update_mappings_updated_at
+    BEFORE UPDATE ON teacher_student_mappings
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE INDEX IF NOT EXISTS idx_families_updated_at ON families(updated_at);
+CREATE INDEX IF NOT EXISTS idx_reflections_updated_at ON reflections(updated_at);
+CREATE INDEX IF NOT EXISTS idx_family_visits_updated_at ON family_visits(updated_at);
+CREATE INDEX IF NOT EXISTS idx_family_members_updated_at ON family_members(updated_at);
+CREATE INDEX IF NOT EXISTS idx_mappings_updated_at ON teacher_student_mappings(updated_at);
+CREATE INDEX IF NOT EXISTS idx_villages_updated_at ON villages(updated_at);
+
+-- ============================================
+-- 2. DELETE TOMBSTONES
+-- ============================================
+CREATE TABLE IF NOT EXISTS deleted_rows (
+  id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
+  table_name text NOT NULL,
+  row_id uuid NOT NULL,
+  deleted_at timestamp with time zone DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_deleted_rows_deleted_at ON deleted_rows(deleted_at);
+
+-- SECURITY DEFINER: deletes made by students/teachers must be able to write
+-- the tombstone even though deleted_rows has no client policies.
+CREATE OR REPLACE FUNCTION record_deleted_row()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO deleted_rows (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$;
+
+-- Row-level triggers also fire for rows removed by ON DELETE CASCADE
+DO $$
+DECLARE
+  t text;
+BEGIN
+  FOREACH t IN ARRAY ARRAY['families', 'family_members', 'family_visits', 'health_measurements',
+                           'villages', 'reflections', 'profiles', 'teacher_student_mappings']
+  LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS record_%s_delete ON %I', t, t);
+    EXECUTE format('CREATE TRIGGER record_%s_delete AFTER DELETE ON %I
+                    FOR EACH ROW EXECUTE FUNCTION record_deleted_row()', t, t);
+  END LOOP;
+END $$;
+
+-- Written by the trigger, read by the service role only
+ALTER TABLE deleted_rows ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+  RAISE NOTICE 'Export support installed: updated_at triggers, deleted_rows tombstones';
+END $$;
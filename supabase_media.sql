@@ -0,0 +1,51 @@
+-- ============================================
+-- FAP NextGen - Media Variants
+-- Run this in Supabase SQL Editor
+-- Filled by media_worker.py. Clients look up an uploaded object's
+-- content hash in media_objects and fetch thumb_path / preview_path from
+-- the 'media-variants' bucket instead of the full-size original.
+-- ============================================
+
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('media-variants', 'media-variants', true)
+ON CONFLICT (id) DO NOTHING;
+
+-- One row per distinct file content (identical uploads share a row)
+CREATE TABLE IF NOT EXISTS media_assets (
+  sha256 text PRIMARY KEY,
+  size_bytes bigint NOT NULL,
+  content_type text,
+  width integer,
+  height integer,
+  thumb_path text,
+  preview_path text,
+  created_at timestamp with time zone DEFAULT now()
+);
+
+-- Every uploaded object and the content it holds
+CREATE TABLE IF NOT EXISTS media_objects (
+  bucket text NOT NULL,
+  path text NOT NULL,
+  sha256 text NOT NULL REFERENCES media_assets(sha256),
+  processed_at timestamp with time zone DEFAULT now(),
+  PRIMARY KEY (bucket, path)
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_objects_sha256 ON media_objects(sha256);
+
+-- RLS: readable by signed-in users (the originals are public already)
+ALTER TABLE media_assets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE media_objects ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Authenticated read media assets" ON media_assets;
+CREATE POLICY "Authenticated read media assets" ON media_assets
+  FOR SELECT TO authenticated USING (true);
+
+DROP POLICY IF EXISTS "Authenticated read media objects" ON media_objects;
+CREATE POLICY "Authenticated read media objects" ON media_objects
+  FOR SELECT TO authenticated USING (true);
+
+DROP POLICY IF EXISTS "Public Read Media Variants" ON storage.objects;
+CREATE POLICY "Public Read Media Variants"
+ON storage.objects FOR SELECT
+USING ( bucket_id = 'media-variants' );
@@ -0,0 +1,186 @@
+-- ============================================
+-- FAP NextGen - Dashboard Rollup Tables
+-- Run this in Supabase SQL Editor
+-- Maintained by rollup_dashboards.py; dashboards read these
+-- instead of counting raw families/visits/reflections per load.
+-- ============================================
+
+-- College grouping uses profiles.institution (set at registration)
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS institution text;
+
+-- ============================================
+-- 1. PER-STUDENT ROLLUPS
+-- ============================================
+CREATE TABLE IF NOT EXISTS student_rollups (
+  student_id uuid PRIMARY KEY REFERENCES profiles(id) ON DELETE CASCADE,
+  families_count integer NOT NULL DEFAULT 0,
+  members_count integer NOT NULL DEFAULT 0,
+  visits_count integer NOT NULL DEFAULT 0,
+  reflections_count integer NOT NULL DEFAULT 0,
+  reflections_pending integer NOT NULL DEFAULT 0,
+  reflections_graded integer NOT NULL DEFAULT 0,
+  graded_score_sum integer NOT NULL DEFAULT 0,
+  last_visit_date date,
+  refreshed_at timestamp with time zone DEFAULT now()
+);
+
+-- ============================================
+-- 2. PER-TEACHER ROLLUPS (active mappings only)
+-- ============================================
+CREATE TABLE IF NOT EXISTS teacher_rollups (
+  teacher_id uuid PRIMARY KEY REFERENCES profiles(id) ON DELETE CASCADE,
+  students_count integer NOT NULL DEFAULT 0,
+  families_count integer NOT NULL DEFAULT 0,
+  members_count integer NOT NULL DEFAULT 0,
+  visits_count integer NOT NULL DEFAULT 0,
+  reflections_count integer NOT NULL DEFAULT 0,
+  reflections_pending integer NOT NULL DEFAULT 0,
+  reflections_graded integer NOT NULL DEFAULT 0,
+  graded_score_sum integer NOT NULL DEFAULT 0,
+  refreshed_at timestamp with time zone DEFAULT now()
+);
+
+-- ============================================
+-- 3. PER-COLLEGE ROLLUPS
+-- ============================================
+CREATE TABLE IF NOT EXISTS college_rollups (
+  institution text PRIMARY KEY,
+  students_count integer NOT NULL DEFAULT 0,
+  families_count integer NOT NULL DEFAULT 0,
+  members_count integer NOT NULL DEFAULT 0,
+  visits_count integer NOT NULL DEFAULT 0,
+  reflections_count integer NOT NULL DEFAULT 0,
+  reflections_pending integer NOT NULL DEFAULT 0,
+  reflections_graded integer NOT NULL DEFAULT 0,
+  graded_score_sum integer NOT NULL DEFAULT 0,
+  refreshed_at timestamp with time zone DEFAULT now()
+);
+
+-- ============================================
+-- 4. JOB STATE
+-- ============================================
+CREATE TABLE IF NOT EXISTS rollup_state (
+  job text PRIMARY KEY,
+  watermark timestamp with time zone NOT NULL
+);
+
+-- Indexes used to find rows touched since the last run
+CREATE INDEX IF NOT EXISTS idx_families_updated_at ON families(updated_at);
+CREATE INDEX IF NOT EXISTS idx_family_members_created_at ON family_members(created_at);
+CREATE INDEX IF NOT EXISTS idx_family_visits_created_at ON family_visits(created_at);
+CREATE INDEX IF NOT EXISTS idx_reflections_updated_at ON reflections(updated_at);
+CREATE INDEX IF NOT EXISTS idx_profiles_updated_at ON profiles(updated_at);
+
+-- Keep updated_at current so edits and grading are picked up incrementally
+-- (update_updated_at_column() is defined in supabase_schema.sql)
+DROP TRIGGER IF EXISTS update_families_updated_at ON families;
+CREATE TRIGGER update_families_updated_at
+    BEFORE UPDATE ON families
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_reflections_updated_at ON reflections;
+CREATE TRIGGER update_reflections_updated_at
+    BEFORE UPDATE ON reflections
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Deleted rows leave nothing behind to compare against the watermark, and a
+-- family moved to another student only shows up under its new owner. These
+-- triggers note the student whose counts went stale instead.
+CREATE TABLE IF NOT EXISTS rollup_dirty_students (
+  student_id uuid NOT NULL,
+  marked_at timestamp with time zone DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_dirty_students_marked_at ON rollup_dirty_students(marked_at);
+
+-- SECURITY DEFINER: deletes made by students/teachers must be able to mark
+-- the student even though rollup_dirty_students has no client policies.
+CREATE OR REPLACE FUNCTION mark_rollup_dirty()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  sid uuid;
+BEGIN
+    IF TG_TABLE_NAME IN ('families', 'reflections') THEN
+        sid := OLD.student_id;
+    ELSE
+        -- family_members / family_visits; when the whole family is deleted
+        -- the families trigger has already marked its student.
+        SELECT student_id INTO sid FROM families WHERE id = OLD.family_id;
+    END IF;
+    IF sid IS NOT NULL THEN
+        INSERT INTO rollup_dirty_students (student_id) VALUES (sid);
+    END IF;
+    RETURN OLD;
+END;
+$$;
+
+DO $$
+DECLARE
+  t text;
+BEGIN
+  FOREACH t IN ARRAY ARRAY['families', 'family_members', 'family_visits', 'reflections']
+  LOOP
+    EXECUTE format('DROP TRIGGER IF EXISTS mark_%s_rollup_dirty ON %I', t, t);
+    EXECUTE format('CREATE TRIGGER mark_%s_rollup_dirty AFTER DELETE ON %I
+                    FOR EACH ROW EXECUTE FUNCTION mark_rollup_dirty()', t, t);
+  END LOOP;
+END $$;
+
+DROP TRIGGER IF EXISTS mark_families_moved_rollup_dirty ON families;
+CREATE TRIGGER mark_families_moved_rollup_dirty
+    AFTER UPDATE OF student_id ON families
+    FOR EACH ROW
+    WHEN (OLD.student_id IS DISTINCT FROM NEW.student_id)
+    EXECUTE FUNCTION mark_rollup_dirty();
+
+-- ============================================
+-- RLS (rollups are written by the service role only)
+-- ============================================
+ALTER TABLE student_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE teacher_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE college_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_state ENABLE ROW LEVEL SECURITY;
+ALTER TABLE rollup_dirty_students ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Students view own rollup" ON student_rollups;
+CREATE POLICY "Students view own rollup" ON student_rollups
+  FOR SELECT USING (student_id = auth.uid());
+
+DROP POLICY IF EXISTS "Teachers view student rollups" ON student_rollups;
+CREATE POLICY "Teachers view student rollups" ON student_rollups
+  FOR SELECT USING (
+    student_id IN (
+      SELECT student_id FROM teacher_student_mappings
+      WHERE teacher_id = auth.uid() AND is_active = true
+    )
+  );
+
+DROP POLICY IF EXISTS "Admins view student rollups" ON student_rollups;
+CREATE POLICY "Admins view student rollups" ON student_rollups
+  FOR SELECT USING (
+    EXISTS (SELECT 1 FROM profiles WHERE id = auth.uid() AND role = 'admin')
+  );
+
+DROP POLICY IF EXISTS "Teachers view own rollup" ON teacher_rollups;
+CREATE POLICY "Teachers view own rollup" ON teacher_rollups
+  FOR SELECT USING (
+    teacher_id = auth.uid()
+    OR EXISTS (SELECT 1 FROM profiles WHERE id = auth.uid() AND role = 'admin')
+  );
+
+DROP POLICY IF EXISTS "Admins view college rollups" ON college_rollups;
+CREATE POLICY "Admins view college rollups" ON college_rollups
+  FOR SELECT USING (
+    EXISTS (SELECT 1 FROM profiles WHERE id = auth.uid() AND role = 'admin')
+  );
+
+DO $$
+BEGIN
+  RAISE NOTICE 'Rollup tables created: student_rollups, teacher_rollups, college_rollups, rollup_state, rollup_dirty_students';
+END $$;